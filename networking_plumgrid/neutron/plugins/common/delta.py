@@ -0,0 +1,41 @@
+# Copyright 2016 PLUMgrid, Inc. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Changes of a resource update relevant to the PLUMgrid Director
+"""
+
+from oslo_config import cfg
+
+delta_opts = [
+    cfg.ListOpt('director_update_ignored_fields',
+                default=['name', 'description', 'binding:host_id',
+                         'updated_at'],
+                help=_("Resource fields the PLUMgrid Director does not use, "
+                       "updates only changing these fields are not sent to "
+                       "the director"))]
+
+cfg.CONF.register_opts(delta_opts, "plumgriddirector")
+
+
+def director_delta(orig, new):
+    """Return the fields relevant to the director changed by an update.
+
+    Maps every changed field of the resource dicts to its original and new
+    values, an empty result means the update need not reach the director.
+    """
+    ignored = set(cfg.CONF.plumgriddirector.director_update_ignored_fields)
+    return dict((field, (orig.get(field), new.get(field)))
+                for field in set(orig) | set(new)
+                if field not in ignored and orig.get(field) != new.get(field))
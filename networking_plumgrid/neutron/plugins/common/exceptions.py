@@ -26,5 +26,13 @@ class PLUMgridConnectionFailed(PLUMgridException):
     message = _("Connection failed with PLUMgrid Director: %(err_msg)s")
 
 
+class PLUMgridCallTimeout(PLUMgridException):
+    message = _("Call to PLUMgrid Director timed out: %(err_msg)s")
+
+
+class PLUMgridDirectorUnavailable(PLUMgridException):
+    message = _("PLUMgrid Director unavailable: %(err_msg)s")
+
+
 class TenantResourcesInUse(base_exec.NeutronException):
     message = _("TenantResourcesInUse: %(err_msg)s")
@@ -0,0 +1,99 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import abc
+
+import six
+
+
+@six.add_metaclass(abc.ABCMeta)
+class LockBackend(object):
+    """Storage of the PLUMgrid locks.
+
+    A backend keeps one record per lock: the locked resource, its parent
+    for nested locks, the owner and a fencing token. Records expire unless
+    renewed by their owner within the lease time.
+    """
+
+    def setup(self):
+        """Prepare the backend when the plugin starts."""
+
+    @abc.abstractmethod
+    def create(self, uuid, owner, lease, parent=None):
+        """Take a lock, see pg_lock_create for the semantics.
+
+        Returns the fencing token, or None if the resource is locked by
+        somebody else.
+        """
+
+    @abc.abstractmethod
+    def held(self, uuid, owners):
+        """Whether other owners hold a live lock on a resource."""
+
+    @abc.abstractmethod
+    def children(self, uuid, owners):
+        """Count the live locks of other owners nested in a resource."""
+
+    @abc.abstractmethod
+    def owned(self, uuid, owner, token):
+        """Whether owner still holds the live lock it took with token."""
+
+    @abc.abstractmethod
+    def handoff(self, uuid, owner, new_owner, lease):
+        """Hand a lock over, returns the new token or None if lost."""
+
+    @abc.abstractmethod
+    def renew(self, owners, lease):
+        """Extend leases, returns the owners which lost their lock."""
+
+    @abc.abstractmethod
+    def release(self, uuid, owner=None):
+        """Release a lock, returns True if it was not held."""
+
+    def sweep(self, lease):
+        """Delete expired locks, returns the number of locks deleted.
+
+        Expired locks keep their resource locked until they are swept.
+        The fencing tokens of resources unlocked for a lease are dropped,
+        new tokens still start above the highest token dropped.
+        """
+        return 0
+
+    def enqueue(self, uuid, owner, lease):
+        """Take a ticket to wait for a lock in turn, in fair mode.
+
+        Backends without a queue return None and locks are not fair.
+        """
+        return None
+
+    def queued(self, uuid, ticket, lease):
+        """Whether live tickets are ahead of ticket, or any if None.
+
+        Also extends the lease of ticket.
+        """
+        return False
+
+    def dequeue(self, ticket):
+        """Drop a ticket."""
+
+    def get(self, uuid):
+        """Return the lock on a resource if its lease has expired."""
+        return None
+
+    def get_lock_id(self, uuid):
+        """Return uuid if the resource is locked."""
+        return uuid if self.held(uuid, []) else None
+
+    def steal(self, uuid):
+        """Drop the lock on a resource whoever holds it."""
+        return self.release(uuid)
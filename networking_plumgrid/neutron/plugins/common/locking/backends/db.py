@@ -0,0 +1,64 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from networking_plumgrid.neutron.plugins.common.locking.backends import base
+from networking_plumgrid.neutron.plugins.db import api as db_api
+
+
+class DBLockBackend(base.LockBackend):
+    """Locks stored in the pg_lock table of the neutron database."""
+
+    def setup(self):
+        db_api.create_table_pg_lock()
+
+    def create(self, uuid, owner, lease, parent=None):
+        return db_api.pg_lock_create(uuid, owner, lease, parent)
+
+    def held(self, uuid, owners):
+        return db_api.pg_lock_held(uuid, owners)
+
+    def children(self, uuid, owners):
+        return db_api.pg_lock_children(uuid, owners)
+
+    def owned(self, uuid, owner, token):
+        return db_api.pg_lock_owned(uuid, owner, token)
+
+    def sweep(self, lease):
+        return db_api.pg_lock_sweep(lease)
+
+    def enqueue(self, uuid, owner, lease):
+        return db_api.pg_lock_enqueue(uuid, owner, lease)
+
+    def queued(self, uuid, ticket, lease):
+        return db_api.pg_lock_queued(uuid, ticket, lease)
+
+    def dequeue(self, ticket):
+        return db_api.pg_lock_dequeue(ticket)
+
+    def get(self, uuid):
+        return db_api.pg_lock_get(uuid)
+
+    def handoff(self, uuid, owner, new_owner, lease):
+        return db_api.pg_lock_handoff(uuid, owner, new_owner, lease)
+
+    def renew(self, owners, lease):
+        return db_api.pg_lock_renew(owners, lease)
+
+    def steal(self, uuid):
+        return db_api.pg_lock_steal(uuid)
+
+    def release(self, uuid, owner=None):
+        return db_api.pg_lock_release(uuid, owner)
+
+    def get_lock_id(self, uuid):
+        return db_api.pg_lock_get_id(uuid)
@@ -0,0 +1,62 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import contextlib
+import fcntl
+import json
+import os
+
+from oslo_concurrency import lockutils  # noqa
+from oslo_config import cfg
+
+from networking_plumgrid.neutron.plugins.common.locking.backends import memory
+
+cfg.CONF.import_opt('lock_file',
+                    'networking_plumgrid.neutron.plugins.common.locking.lock',
+                    group='plumgriddirector')
+
+
+class FileLockBackend(memory.MemoryLockBackend):
+    """Locks kept in a file shared by the processes of a single node.
+
+    Every operation reads and rewrites the lock table under an exclusive
+    fcntl lock on the file, which is enough for a single neutron-server
+    node and avoids any database round trip.
+    """
+
+    def __init__(self):
+        super(FileLockBackend, self).__init__()
+        conf = cfg.CONF
+        self.path = conf.plumgriddirector.lock_file
+        if not self.path:
+            if not conf.oslo_concurrency.lock_path:
+                raise cfg.RequiredOptError('lock_file',
+                                           cfg.OptGroup('plumgriddirector'))
+            self.path = os.path.join(conf.oslo_concurrency.lock_path,
+                                     'neutron-pg-lock.json')
+
+    @contextlib.contextmanager
+    def _table(self):
+        with self._mutex:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            with os.fdopen(fd, 'r+') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                data = f.read()
+                state = json.loads(data) if data else self._new_state()
+                yield state
+                new_data = json.dumps(state)
+                if new_data != data:
+                    f.seek(0)
+                    f.truncate()
+                    f.write(new_data)
+                    f.flush()
@@ -0,0 +1,161 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import contextlib
+import threading
+import time
+
+from networking_plumgrid.neutron.plugins.common.locking.backends import base
+
+
+class MemoryLockBackend(base.LockBackend):
+    """Locks kept in the memory of the neutron-server process.
+
+    Only processes sharing the memory see each other's locks, this
+    backend is meant for unit tests and benchmarks.
+    """
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._state = self._new_state()
+
+    @staticmethod
+    def _new_state():
+        # Locks by uuid, the last fencing token of every resource with the
+        # time it was handed out, the highest token dropped from fences,
+        # and the tickets of waiting locks as [ticket, uuid, owner,
+        # expires_at]
+        return {'locks': {}, 'fences': {}, 'floor': 0, 'queue': [],
+                'tickets': 0}
+
+    @contextlib.contextmanager
+    def _table(self):
+        with self._mutex:
+            yield self._state
+
+    @staticmethod
+    def _live(lock, now):
+        return lock['expires_at'] > now
+
+    @staticmethod
+    def _next_token(state, uuid):
+        token = state['fences'].get(uuid, [state['floor']])[0] + 1
+        state['fences'][uuid] = [token, time.time()]
+        return token
+
+    def create(self, uuid, owner, lease, parent=None):
+        with self._table() as state:
+            if uuid in state['locks']:
+                return None
+            token = self._next_token(state, uuid)
+            state['locks'][uuid] = {'parent': parent, 'owner': owner,
+                                    'token': token,
+                                    'expires_at': time.time() + lease}
+            return token
+
+    def sweep(self, lease):
+        now = time.time()
+        with self._table() as state:
+            expired = [uuid for uuid, lock in state['locks'].items()
+                       if not self._live(lock, now)]
+            for uuid in expired:
+                del state['locks'][uuid]
+            state['queue'] = [t for t in state['queue'] if t[3] > now]
+            for uuid, fence in list(state['fences'].items()):
+                if uuid not in state['locks'] and fence[1] <= now - lease:
+                    state['floor'] = max(state['floor'], fence[0])
+                    del state['fences'][uuid]
+        return len(expired)
+
+    def enqueue(self, uuid, owner, lease):
+        with self._table() as state:
+            state['tickets'] += 1
+            state['queue'].append([state['tickets'], uuid, owner,
+                                   time.time() + lease])
+            return state['tickets']
+
+    def queued(self, uuid, ticket, lease):
+        now = time.time()
+        with self._table() as state:
+            for queued in state['queue']:
+                if queued[0] == ticket:
+                    queued[3] = now + lease
+            return any(queued[1] == uuid and queued[3] > now and
+                       (ticket is None or queued[0] < ticket)
+                       for queued in state['queue'])
+
+    def dequeue(self, ticket):
+        with self._table() as state:
+            state['queue'] = [t for t in state['queue'] if t[0] != ticket]
+
+    def held(self, uuid, owners):
+        with self._table() as state:
+            lock = state['locks'].get(uuid)
+            return (lock is not None and lock['owner'] not in owners and
+                    self._live(lock, time.time()))
+
+    def children(self, uuid, owners):
+        now = time.time()
+        with self._table() as state:
+            return len([lock for lock in state['locks'].values()
+                        if lock['parent'] == uuid and
+                        lock['owner'] not in owners and
+                        self._live(lock, now)])
+
+    def owned(self, uuid, owner, token):
+        with self._table() as state:
+            lock = state['locks'].get(uuid)
+            return (lock is not None and lock['owner'] == owner and
+                    lock['token'] == token and self._live(lock, time.time()))
+
+    def get(self, uuid):
+        with self._table() as state:
+            lock = state['locks'].get(uuid)
+            if lock is not None and not self._live(lock, time.time()):
+                return [dict(lock, uuid=uuid)]
+            return []
+
+    def get_lock_id(self, uuid):
+        with self._table() as state:
+            if uuid in state['locks']:
+                return uuid
+
+    def handoff(self, uuid, owner, new_owner, lease):
+        with self._table() as state:
+            lock = state['locks'].get(uuid)
+            if lock is None or lock['owner'] != owner:
+                return None
+            lock.update(owner=new_owner,
+                        token=self._next_token(state, uuid),
+                        expires_at=time.time() + lease)
+            return lock['token']
+
+    def renew(self, owners, lease):
+        expires_at = time.time() + lease
+        renewed = set()
+        with self._table() as state:
+            for lock in state['locks'].values():
+                if lock['owner'] in owners:
+                    lock['expires_at'] = expires_at
+                    renewed.add(lock['owner'])
+        return set(owners) - renewed
+
+    def release(self, uuid, owner=None):
+        with self._table() as state:
+            lock = state['locks'].get(uuid)
+            if lock is None or owner not in (None, lock['owner']):
+                return True
+            del state['locks'][uuid]
+
+    def steal(self, uuid):
+        return self.release(uuid)
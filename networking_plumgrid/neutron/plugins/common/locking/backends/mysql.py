@@ -0,0 +1,192 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+
+from oslo_config import cfg
+from oslo_log import log as logging
+import sqlalchemy
+
+from networking_plumgrid.neutron.plugins.common import exceptions as exception
+from networking_plumgrid.neutron.plugins.common.locking.backends import db
+from networking_plumgrid.neutron.plugins.db import api as db_api
+from neutron.i18n import _LW
+
+LOG = logging.getLogger(__name__)
+
+
+class MySQLLockBackend(db.DBLockBackend):
+    """Top level locks taken as MySQL advisory locks.
+
+    A GET_LOCK lock is released by the server as soon as the connection
+    of its holder goes away, so it needs neither a row nor a lease. The
+    fencing token still comes from the pg_lock_fence table.
+
+    Every advisory lock held pins a connection of the lock pool until it
+    is released. A process holds at most lock_max_pool_size of them, the
+    overflow connections are left for the other lock queries; further
+    locks wait as if they were held elsewhere.
+
+    Nested locks are still stored in the pg_lock table, the hierarchy
+    checks need to find them by parent.
+    """
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        # Advisory locks held by this process: uuid -> [owner, connection,
+        # connection id, fencing token]
+        self._held = {}
+
+    def setup(self):
+        super(MySQLLockBackend, self).setup()
+        dialect = db_api.get_lock_engine().dialect.name
+        if dialect != 'mysql':
+            raise exception.PLUMgridException(
+                err_msg="lock_backend mysql needs a MySQL database, "
+                        "found %s" % dialect)
+
+    @staticmethod
+    def _name(uuid):
+        return "pg_lock.%s" % uuid
+
+    def create(self, uuid, owner, lease, parent=None):
+        if parent is not None:
+            return super(MySQLLockBackend, self).create(uuid, owner, lease,
+                                                        parent)
+        pinned = cfg.CONF.plumgriddirector.lock_max_pool_size
+        with self._mutex:
+            if uuid in self._held:
+                return None
+            if len(self._held) >= pinned:
+                LOG.debug("All advisory lock connections in use, %s waits",
+                          uuid)
+                return None
+            # Counted right away, the connection is taken outside the mutex
+            self._held[uuid] = [owner, None, None, None]
+        conn = None
+        got = False
+        try:
+            conn = db_api.get_lock_engine().connect()
+            got, conn_id = conn.execute(
+                sqlalchemy.text("SELECT GET_LOCK(:name, 0), CONNECTION_ID()"),
+                name=self._name(uuid)).first()
+            if got:
+                token = db_api.pg_lock_next_token(uuid)
+        except Exception:
+            LOG.warning(_LW("Lock contest, sending back to re-try: %s"), uuid)
+            with self._mutex:
+                del self._held[uuid]
+            if conn is not None:
+                if got:
+                    # Dropping the connection releases the lock
+                    conn.invalidate()
+                conn.close()
+            raise exception.TenantResourcesInUse(err_msg=uuid)
+        if not got:
+            with self._mutex:
+                del self._held[uuid]
+            conn.close()
+            return None
+        with self._mutex:
+            self._held[uuid] = [owner, conn, conn_id, token]
+        return token
+
+    def held(self, uuid, owners):
+        try:
+            conn = db_api.get_lock_engine().connect()
+            try:
+                conn_id = conn.execute(
+                    sqlalchemy.text("SELECT IS_USED_LOCK(:name)"),
+                    name=self._name(uuid)).scalar()
+            finally:
+                conn.close()
+        except Exception:
+            LOG.warning(_LW("Lock contest, sending back to re-try: %s"), uuid)
+            raise exception.TenantResourcesInUse(err_msg=uuid)
+        if conn_id is not None:
+            with self._mutex:
+                own = [held[2] for held in self._held.values()
+                       if held[0] in owners]
+            if conn_id not in own:
+                return True
+        return super(MySQLLockBackend, self).held(uuid, owners)
+
+    def owned(self, uuid, owner, token):
+        with self._mutex:
+            held = self._held.get(uuid)
+        if held is None:
+            return super(MySQLLockBackend, self).owned(uuid, owner, token)
+        if held[0] != owner or held[3] != token:
+            return False
+        try:
+            return bool(held[1].execute(
+                sqlalchemy.text("SELECT IS_USED_LOCK(:name) = "
+                                "CONNECTION_ID()"),
+                name=self._name(uuid)).scalar())
+        except Exception:
+            return False
+
+    def handoff(self, uuid, owner, new_owner, lease):
+        with self._mutex:
+            held = self._held.get(uuid)
+        if held is not None and held[0] == owner:
+            # Only the owner hands its lock over, nobody else changes it
+            token = db_api.pg_lock_next_token(uuid)
+            with self._mutex:
+                held[0] = new_owner
+                held[3] = token
+            return token
+        return super(MySQLLockBackend, self).handoff(uuid, owner,
+                                                     new_owner, lease)
+
+    def renew(self, owners, lease):
+        lost = set()
+        advisory = set()
+        with self._mutex:
+            for uuid, (owner, conn, conn_id, token) in self._held.items():
+                if owner not in owners or conn is None:
+                    continue
+                advisory.add(owner)
+                try:
+                    alive = conn.execute(
+                        sqlalchemy.text("SELECT IS_USED_LOCK(:name) = "
+                                        "CONNECTION_ID()"),
+                        name=self._name(uuid)).scalar()
+                except Exception:
+                    alive = False
+                if not alive:
+                    lost.add(owner)
+        rows = [owner for owner in owners if owner not in advisory]
+        if rows:
+            lost |= super(MySQLLockBackend, self).renew(rows, lease)
+        return lost
+
+    def release(self, uuid, owner=None):
+        with self._mutex:
+            held = self._held.get(uuid)
+            if held is None or owner not in (None, held[0]):
+                held = None
+            else:
+                del self._held[uuid]
+                conn = held[1]
+                try:
+                    conn.execute(sqlalchemy.text("SELECT RELEASE_LOCK(:name)"),
+                                 name=self._name(uuid))
+                except Exception:
+                    # Dropping the connection releases the lock
+                    LOG.debug("Failed to release advisory lock %s", uuid)
+                    conn.invalidate()
+                finally:
+                    conn.close()
+        if held is None:
+            return super(MySQLLockBackend, self).release(uuid, owner)
@@ -11,31 +11,476 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import contextlib
+import os
+import random
+import socket
+import threading
+import time
+import zlib
 
+from oslo_concurrency import lockutils
+from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import excutils
+from oslo_utils import uuidutils
 
 from networking_plumgrid.neutron.plugins.common import exceptions as exception
 from networking_plumgrid.neutron.plugins.common.locking import lock_object
-from neutron.i18n import _LI, _LW
-from retrying import retry
+from neutron.i18n import _LE, _LI, _LW
 
 LOG = logging.getLogger(__name__)
 
+# Parent of the router gateway locks of all external networks
 GL = "pg-gl"
 
+lock_opts = [
+    cfg.IntOpt('lock_wait_timeout', default=300,
+               help=_("Maximum number of seconds to wait for a PLUMgrid "
+                      "lock before giving up")),
+    cfg.FloatOpt('lock_poll_interval_min', default=0.01,
+                 help=_("Minimum interval in seconds between attempts to "
+                        "take a lock held by another process. Attempts "
+                        "start a quarter of the average hold time of "
+                        "similar locks apart and back off exponentially")),
+    cfg.FloatOpt('lock_poll_interval_max', default=2.0,
+                 help=_("Maximum interval in seconds between attempts to "
+                        "take a lock held by another process")),
+    cfg.IntOpt('lock_lease_time', default=30,
+               help=_("Number of seconds a lock stays valid without being "
+                      "renewed by its holder. Holders renew their locks "
+                      "every lock_lease_time / 3 seconds")),
+    cfg.IntOpt('port_lock_stripes', default=32,
+               help=_("Number of host-wide locks port operations are "
+                      "spread over by network. Port operations on networks "
+                      "mapped to different locks run concurrently")),
+    cfg.IntOpt('lock_max_handoffs', default=8,
+               help=_("Maximum number of times in a row a lock is handed "
+                      "over to the next waiter of the same process before "
+                      "it is released for other processes to take")),
+    cfg.IntOpt('lock_sweep_interval', default=10, min=1,
+               help=_("Average number of seconds between deletions of "
+                      "expired locks by each neutron-server process, an "
+                      "expired lock keeps its resource locked until then")),
+    cfg.BoolOpt('lock_fair', default=False,
+                help=_("Grant exclusive locks contended by several "
+                       "neutron-server processes in the order they were "
+                       "requested. Every acquisition then first checks "
+                       "that nobody is waiting for the lock")),
+    cfg.StrOpt('lock_backend', default='db',
+               help=_("Where PLUMgrid locks are kept: 'db' for the pg_lock "
+                      "table, 'mysql' for MySQL advisory locks, 'file' for "
+                      "a lock file shared by the processes of a single "
+                      "node, 'memory' for a single process, or the class "
+                      "path of a custom backend")),
+    cfg.StrOpt('lock_file',
+               help=_("Lock table of the file lock backend, defaults to "
+                      "neutron-pg-lock.json in the oslo_concurrency "
+                      "lock_path"))]
 
-def retry_if_res_error(excp):
-    return isinstance(excp, exception.TenantResourcesInUse)
+cfg.CONF.register_opts(lock_opts, "plumgriddirector")
+
+
+@contextlib.contextmanager
+def _no_lock():
+    yield
+
+
+def striped_lock(name, key):
+    """Host-wide lock on one of port_lock_stripes locks picked by key.
+
+    A stripe is taken before the PGLock of its key, none is taken when the
+    current operation already holds that PGLock, e.g. the network locks
+    of a router being deleted with its ports.
+    """
+    if any(lock.uuid == key for lock in held_locks()):
+        return _no_lock()
+    stripes = max(cfg.CONF.plumgriddirector.port_lock_stripes, 1)
+    stripe = (zlib.crc32(key.encode('utf-8')) & 0xffffffff) % stripes
+    return lockutils.lock("%s-%d" % (name, stripe),
+                          lock_file_prefix='neutron-', external=True)
+
+
+class WaitQueue(object):
+    """Per-resource wait queue for lock waiters in this process.
+
+    Waiters register before they try the lock so that a release happening
+    in between is never missed. A release wakes the oldest waiter only,
+    waiters in other processes fall back to polling.
+    """
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._waiters = {}
+
+    def register(self, uuid, event=None):
+        if event is None:
+            event = threading.Event()
+        with self._mutex:
+            self._waiters.setdefault(uuid, []).append(event)
+        return event
+
+    def unregister(self, uuid, event):
+        with self._mutex:
+            waiters = self._waiters.get(uuid)
+            if waiters is None:
+                return
+            if event in waiters:
+                waiters.remove(event)
+            if event.is_set() and waiters:
+                # The wakeup was not consumed, pass it on
+                waiters[0].set()
+            if not waiters:
+                del self._waiters[uuid]
+
+    def notify(self, uuid, wake_all=False):
+        with self._mutex:
+            waiters = self._waiters.get(uuid)
+            if waiters:
+                for event in (waiters if wake_all else waiters[:1]):
+                    event.set()
+
+
+class LeaseKeeper(object):
+    """Renew the leases of all locks held by this process.
+
+    A single thread renews every lease with one query, it only runs
+    while this process holds locks.
+    """
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._locks = {}
+        self._thread = None
+
+    def add(self, lock):
+        with self._mutex:
+            self._locks[lock.owner] = lock
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+
+    def discard(self, lock):
+        with self._mutex:
+            self._locks.pop(lock.owner, None)
+
+    def _run(self):
+        while True:
+            lease = cfg.CONF.plumgriddirector.lock_lease_time
+            time.sleep(lease / 3.0)
+            with self._mutex:
+                owners = list(self._locks)
+                if not owners:
+                    self._thread = None
+                    return
+            try:
+                lost = lock_object.PGLock.renew(owners, lease)
+            except Exception:
+                LOG.exception(_LE("Failed to renew PLUMgrid lock leases"))
+                continue
+            for owner in lost:
+                with self._mutex:
+                    lock = self._locks.pop(owner, None)
+                if lock is not None:
+                    # Its holder finds out before its next director call
+                    lock.lost = True
+                    LOG.error(_LE("Lock on resource %(resource)s held by "
+                                  "%(owner)s was lost"),
+                              {'resource': lock.uuid, 'owner': owner})
+
+
+class LockSweeper(object):
+    """Delete expired locks in the background.
+
+    Every neutron-server process sweeps, at randomized intervals; sweeping
+    is idempotent so no coordination is needed. The thread is started by
+    the first lock taken in the process, after API workers are forked.
+    """
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._pid = None
+
+    def start(self):
+        with self._mutex:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            thread = threading.Thread(target=self._run)
+            thread.daemon = True
+            thread.start()
+
+    def _run(self):
+        while True:
+            conf = cfg.CONF.plumgriddirector
+            time.sleep(random.uniform(0.5, 1.5) * conf.lock_sweep_interval)
+            try:
+                deleted = lock_object.PGLock.sweep(conf.lock_lease_time)
+            except Exception:
+                LOG.exception(_LE("Failed to sweep expired PLUMgrid locks"))
+                continue
+            if deleted:
+                LOG.info(_LI("Deleted %d expired PLUMgrid locks"), deleted)
+
+
+class _Waiter(object):
+    def __init__(self, lock):
+        self.lock = lock
+        self.event = threading.Event()
+        self.handed = False
+        self.abandoned = False
+        self._mutex = threading.Lock()
+
+    def wake(self, handed):
+        """Give the turn to the waiter, False if it gave up waiting."""
+        with self._mutex:
+            if self.abandoned:
+                return False
+            self.handed = handed
+            self.event.set()
+            return True
+
+    def abandon(self):
+        """Give up waiting, False if the turn was already given."""
+        with self._mutex:
+            if self.event.is_set():
+                return False
+            self.abandoned = True
+            return True
+
+
+class LocalLocks(object):
+    """Coalesce the locks of this process on the same resource.
+
+    Only one exclusive lock per resource, the current one, competes for
+    the pg_lock row at a time. The others queue up in this process and
+    get their turn in order, with the row handed over to them when the
+    current lock is released.
+    """
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._current = {}
+        self._queues = {}
+
+    def enter(self, lock, timeout):
+        """Wait for the turn of a lock.
+
+        Returns True when the row was handed over to the lock, False when
+        the lock has to take it.
+        """
+        with self._mutex:
+            if lock.uuid not in self._current:
+                self._current[lock.uuid] = lock
+                return False
+            waiter = _Waiter(lock)
+            self._queues.setdefault(lock.uuid,
+                                    collections.deque()).append(waiter)
+        err_msg = ("Resource (" + lock.uuid + ") is locked by another "
+                   "request. Please re-try")
+        if not waiter.event.wait(timeout):
+            with self._mutex:
+                queue = self._queues.get(lock.uuid, ())
+                if waiter in queue:
+                    queue.remove(waiter)
+                    raise exception.TenantResourcesInUse(err_msg=err_msg)
+            # The turn is being passed on to us, once the current lock is
+            # done with the database. Do not wait for it forever if that
+            # hangs, but pass the turn on then.
+            lease = cfg.CONF.plumgriddirector.lock_lease_time
+            if not waiter.event.wait(lease) and waiter.abandon():
+                self.pass_on(lock)
+                raise exception.TenantResourcesInUse(err_msg=err_msg)
+        return waiter.handed
+
+    def leave(self, lock):
+        """Pass the turn of a lock to the next waiter, which is returned."""
+        with self._mutex:
+            if self._current.get(lock.uuid) is not lock:
+                return None
+            queue = self._queues.get(lock.uuid)
+            if not queue:
+                del self._current[lock.uuid]
+                self._queues.pop(lock.uuid, None)
+                return None
+            waiter = queue.popleft()
+            self._current[lock.uuid] = waiter.lock
+            return waiter
+
+    def pass_on(self, lock):
+        """Let the next waiter of a lock take the row itself."""
+        waiter = self.leave(lock)
+        while waiter is not None and not waiter.wake(False):
+            waiter = self.leave(waiter.lock)
+
+
+class LockStats(object):
+    """Contention statistics of the locks taken by this process.
+
+    Acquisitions are aggregated by key class (tenant, resource or gateway
+    locks), by tenant and by the plugin method taking the lock:
+    time spent waiting and holding, retries against other processes,
+    failures to acquire and releases of locks which had already expired.
+
+    A moving average of the hold times is also kept by key class and by
+    method, lock retries back off according to it.
+    """
+
+    COUNTERS = ('acquired', 'failed', 'retries', 'released', 'expired',
+                'wait_total', 'wait_max', 'hold_total', 'hold_max')
+
+    # Weight of the last hold time in the moving average
+    EWMA_WEIGHT = 0.2
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._stats = {}
+        self._hold_ewma = {}
+
+    @staticmethod
+    def _keys(lock):
+        if GL in (lock.uuid, lock.parent):
+            kind = 'gateway'
+        else:
+            kind = 'tenant' if lock.parent is None else 'resource'
+        keys = [('class', kind), ('tenant', lock.parent or lock.uuid)]
+        if lock.name is not None:
+            keys.append(('method', lock.name))
+        return keys
+
+    def _record(self, lock, **values):
+        with self._mutex:
+            for key in self._keys(lock):
+                stats = self._stats.get(key)
+                if stats is None:
+                    stats = self._stats[key] = dict.fromkeys(self.COUNTERS,
+                                                             0)
+                for name, value in values.items():
+                    if name.endswith('_max'):
+                        stats[name] = max(stats[name], value)
+                    else:
+                        stats[name] += value
+
+    def acquired(self, lock, wait):
+        self._record(lock, acquired=1, retries=lock.retries,
+                     wait_total=wait, wait_max=wait)
+
+    def failed(self, lock, wait):
+        self._record(lock, failed=1, retries=lock.retries,
+                     wait_total=wait, wait_max=wait)
+
+    def released(self, lock, hold):
+        self._record(lock, released=1, hold_total=hold, hold_max=hold)
+        with self._mutex:
+            for key in self._keys(lock):
+                if key[0] == 'tenant':
+                    continue
+                ewma = self._hold_ewma.get(key, hold)
+                self._hold_ewma[key] = ewma + self.EWMA_WEIGHT * (hold - ewma)
+
+    def expected_hold(self, lock):
+        """Average hold time of locks like lock, None if not known yet.
+
+        The average of the method taking the lock is preferred over the
+        one of its key class.
+        """
+        keys = self._keys(lock)
+        with self._mutex:
+            for key in reversed(keys):
+                if key in self._hold_ewma:
+                    return self._hold_ewma[key]
+        return None
+
+    def expired(self, lock):
+        self._record(lock, expired=1)
+
+    def snapshot(self, group=None):
+        """Return the statistics by group ('class', 'tenant' or 'method').
+
+        Average wait and hold times are computed for every entry.
+        """
+        with self._mutex:
+            result = {}
+            for (kind, key), stats in self._stats.items():
+                if group is not None and kind != group:
+                    continue
+                stats = dict(stats)
+                stats['wait_avg'] = stats['wait_total'] / max(
+                    stats['acquired'] + stats['failed'], 1)
+                stats['hold_avg'] = stats['hold_total'] / max(
+                    stats['released'], 1)
+                stats['hold_ewma'] = self._hold_ewma.get((kind, key))
+                result.setdefault(kind, {})[key] = stats
+        return result.get(group, {}) if group is not None else result
+
+    def reset(self):
+        with self._mutex:
+            self._stats.clear()
+            self._hold_ewma.clear()
+
+
+waiters = WaitQueue()
+leases = LeaseKeeper()
+sweeper = LockSweeper()
+local = LocalLocks()
+stats = LockStats()
+
+# Locks held by the current (green)thread
+_held = threading.local()
+
+
+def held_locks():
+    """Return the locks held by the current operation."""
+    if not hasattr(_held, 'locks'):
+        _held.locks = []
+    return _held.locks
+
+
+def verify_held():
+    """Check every lock of the current operation is still held."""
+    for lock in held_locks():
+        lock.verify()
+
+_HOST = socket.gethostname()
 
 
 class PGLock(object):
-    def __init__(self, context, uuid, ds=True):
+    """Lock on a PLUMgrid resource shared by all neutron-server processes.
+
+    Locks form a two level hierarchy: a lock with a parent (a network of a
+    tenant) only excludes other locks on the same resource, while a lock
+    without a parent (a tenant) also waits for every lock nested in it to
+    be released and keeps new ones out while held.
+    """
+
+    def __init__(self, context, uuid, ds=True, parent=None, name=None):
         self.context = context
         self.uuid = uuid
+        self.parent = parent
         self.listener = None
         self.ds = ds
+        # Unique holder id, only this lock instance may release the lock
+        self.owner = "%s:%d:%s" % (_HOST, os.getpid(),
+                                   uuidutils.generate_uuid())
+        # Fencing token of the lock while held, increases with every
+        # acquisition of the resource
+        self.token = None
+        # Set when the lease of the lock could not be renewed
+        self.lost = False
+        # Number of times in a row the row was handed over in this process
+        self.handoffs = 0
+        # Set while the resource is covered by a lock held by the same
+        # operation, nothing is taken or released then
+        self.reentrant = False
+        # Plugin method taking the lock, for the statistics
+        self.name = name
+        # Failed attempts to take the row during the last acquisition
+        self.retries = 0
+        # Place in the queue of the resource while waiting in fair mode
+        self.ticket = None
+        self.acquired_at = None
 
     @staticmethod
     def get_lock_id(self):
@@ -44,56 +489,258 @@ class PGLock(object):
     def try_acquire(self):
         """
         Try to acquire a lock, but don't raise resource in use
-        exception or try to steal lock.
+        exception. Returns the fencing token when the lock was acquired.
         """
-        return lock_object.PGLock.create(self.uuid)
+        try:
+            return self._create()
+        except exception.TenantResourcesInUse:
+            return None
 
-    @retry(wait_random_min=500, wait_random_max=4000, stop_max_attempt_number=120, retry_on_exception=retry_if_res_error)  # noqa
-    def acquire(self, retry=True):
+    def _create(self):
+        token = lock_object.PGLock.create(
+            self.uuid, self.owner,
+            cfg.CONF.plumgriddirector.lock_lease_time, self.parent)
+        if token is not None:
+            self.token = token
+            self.lost = False
+            leases.add(self)
+        return token
+
+    def acquire(self, blocking=True):
         """
         Acquire a lock on the resource.
 
-        :param retry: When True, retry if lock was released while stealing.
-        :type retry: boolean
+        :param blocking: When True, wait until the lock is released by its
+                         holder or lock_wait_timeout expires. Waiters in
+                         this process are woken up as soon as the lock is
+                         released, other processes are polled with an
+                         increasing interval.
+        :type blocking: boolean
         """
         if not self.ds:
             return
-        err_msg = ("Tenant (" + self.uuid + ") resources are currently in "
-                   " use by another session. Please re-try")
-        lock_id = lock_object.PGLock.create(self.uuid)
-        if lock_id is None:
-            LOG.debug("Lock acquired on resource "
-                      "%(resource)s" % {'resource': self.uuid})
+        if self._covered():
+            LOG.debug("Resource %(resource)s is already locked by this "
+                      "operation" % {'resource': self.uuid})
+            self.reentrant = True
             return
 
-        if (lock_id == self.uuid):
-            expired_locks = False
-            # Check for a potential expired locks and release them
-            exp_locks = lock_object.PGLock.get(self.uuid)
-            for l in exp_locks:
-                expired_locks = True
-                LOG.info(_LI("Releasing an expired lock for resource "
-                         " %(resource)s"), {'resource': l.uuid})
-                self.release(l.uuid)
-            if not expired_locks:
+        sweeper.start()
+        conf = cfg.CONF.plumgriddirector
+        start = time.time()
+        deadline = start + conf.lock_wait_timeout
+        self.retries = 0
+        try:
+            self._acquire(blocking, deadline)
+        except exception.TenantResourcesInUse:
+            with excutils.save_and_reraise_exception():
+                stats.failed(self, time.time() - start)
+        self.acquired_at = time.time()
+        stats.acquired(self, self.acquired_at - start)
+        held_locks().append(self)
+
+    def _acquire(self, blocking, deadline):
+        if local.enter(self, max(deadline - time.time(), 0)
+                       if blocking else 0):
+            LOG.debug("Lock on resource %(resource)s handed over with "
+                      "token %(token)s" % {'resource': self.uuid,
+                                           'token': self.token})
+        else:
+            try:
+                self._acquire_row(blocking, deadline)
+            except Exception:
+                with excutils.save_and_reraise_exception():
+                    local.pass_on(self)
+
+    def _covered(self):
+        for lock in held_locks():
+            if lock.uuid == self.uuid and lock.parent == self.parent:
+                return True
+            if self.parent is not None and lock.uuid == self.parent:
+                return True
+        return False
+
+    def _owners(self):
+        # Locks held by the same operation never conflict
+        return [self.owner] + [lock.owner for lock in held_locks()]
+
+    def _poll_interval(self):
+        # Poll a few times over the expected hold time of the lock, locks
+        # held for long are not worth polling every few milliseconds
+        conf = cfg.CONF.plumgriddirector
+        hold = stats.expected_hold(self)
+        if hold is None:
+            return conf.lock_poll_interval_min
+        return min(max(hold / 4, conf.lock_poll_interval_min),
+                   conf.lock_poll_interval_max)
+
+    def _fair(self):
+        return cfg.CONF.plumgriddirector.lock_fair
+
+    def _acquire_row(self, blocking, deadline):
+        try:
+            self._poll_row(blocking, deadline)
+        finally:
+            if self.ticket is not None:
+                try:
+                    lock_object.PGLock.dequeue(self.ticket)
+                except Exception:
+                    # The ticket expires anyway
+                    LOG.warning(_LW("Failed to leave the queue of "
+                                    "resource %s"), self.uuid, exc_info=True)
+                self.ticket = None
+
+    def _poll_row(self, blocking, deadline):
+        conf = cfg.CONF.plumgriddirector
+        interval = self._poll_interval()
+        while True:
+            event = waiters.register(self.uuid)
+            if self.parent is not None:
+                waiters.register(self.parent, event)
+            try:
+                try:
+                    return self._acquire_once()
+                except exception.TenantResourcesInUse:
+                    self.retries += 1
+                    remaining = deadline - time.time()
+                    if not blocking or remaining <= 0:
+                        if self.token is not None:
+                            # Gave up waiting for nested locks
+                            self._release_row(self.uuid)
+                        raise
+                    if self.ticket is None and self._fair():
+                        self.ticket = lock_object.PGLock.enqueue(
+                            self.uuid, self.owner, conf.lock_lease_time)
+                event.wait(min(remaining,
+                               random.uniform(interval / 2, interval)))
+            finally:
+                waiters.unregister(self.uuid, event)
+                if self.parent is not None:
+                    waiters.unregister(self.parent, event)
+            interval = min(interval * 2, conf.lock_poll_interval_max)
+
+    def _acquire_once(self):
+        err_msg = ("Tenant (" + (self.parent or self.uuid) + ") resources "
+                   "are currently in use by another session. Please re-try")
+        if self.token is None:
+            if self._fair() and lock_object.PGLock.queued(
+                    self.uuid, self.ticket,
+                    cfg.CONF.plumgriddirector.lock_lease_time):
+                # Others have been waiting for longer
                 raise exception.TenantResourcesInUse(err_msg=err_msg)
-            else:
-                lock_id = lock_object.PGLock.create(self.uuid)
-                if lock_id is None:
-                    LOG.debug("Lock acquired on resource "
-                              "%(resource)s" % {'resource': self.uuid})
-                    return
+            try:
+                token = self._create()
+            except exception.TenantResourcesInUse:
+                token = None
+            if token is None:
+                raise exception.TenantResourcesInUse(err_msg=err_msg)
+            if (self.parent is not None and
+                lock_object.PGLock.held(self.parent, self._owners())):
+                # The whole parent is locked, step back until it is done
+                self._release_row(self.uuid)
                 raise exception.TenantResourcesInUse(err_msg=err_msg)
+        if (self.parent is None and
+            lock_object.PGLock.children(self.uuid, self._owners())):
+            # Keep the lock so that no new nested lock gets in, and wait
+            # for the nested locks being held to be released
+            raise exception.TenantResourcesInUse(err_msg=err_msg)
+        LOG.debug("Lock acquired on resource %(resource)s with token "
+                  "%(token)s" % {'resource': self.uuid, 'token': self.token})
 
     def release(self, uuid):
-        """Release a lock."""
+        """Release a lock.
+
+        The pg_lock row is handed over to the next lock of this process
+        waiting for the resource when there is one.
+        """
+        if uuid == self.uuid:
+            if self.reentrant:
+                self.reentrant = False
+                return
+            if self in held_locks():
+                held_locks().remove(self)
+            if self.acquired_at is not None:
+                stats.released(self, time.time() - self.acquired_at)
+                self.acquired_at = None
+        if uuid != self.uuid:
+            return self._release_row(uuid)
+        waiter = local.leave(self)
+        handed = False
+        try:
+            if waiter is not None:
+                try:
+                    handed = self._hand_off(waiter.lock)
+                except Exception:
+                    LOG.warning(_LW("Failed to hand the lock on resource %s "
+                                    "over, releasing it"), uuid,
+                                exc_info=True)
+            if not handed:
+                self._release_row(uuid)
+        finally:
+            # The waiter is current now, it has to be woken whatever
+            # happened above or the resource stays locked in this process
+            if waiter is not None and not waiter.wake(handed) and handed:
+                # It gave up waiting in the meantime and passed its turn on
+                waiter.lock._release_row(uuid)
+
+    def _hand_off(self, lock):
+        conf = cfg.CONF.plumgriddirector
+        if self.token is None or self.handoffs >= conf.lock_max_handoffs:
+            return False
+        if lock.parent != self.parent:
+            # The row records the parent it was taken under, e.g. an
+            # external network locked for a gateway or for a tenant port
+            return False
+        if (lock.parent is not None and
+            lock_object.PGLock.held(lock.parent, [self.owner])):
+            # Let the lock waiting on the parent in
+            return False
+        if self._fair() and lock_object.PGLock.queued(
+                self.uuid, None, conf.lock_lease_time):
+            # Processes waiting in the queue come first
+            return False
+        token = lock_object.PGLock.handoff(self.uuid, self.owner, lock.owner,
+                                           conf.lock_lease_time)
+        if token is None:
+            return False
+        leases.discard(self)
+        self.token = None
+        lock.token = token
+        lock.lost = False
+        lock.handoffs = self.handoffs + 1
+        leases.add(lock)
+        return True
+
+    def _release_row(self, uuid):
         # Only the resource that owns the lock will be releasing it.
-        result = lock_object.PGLock.release(uuid)
+        leases.discard(self)
+        self.token = None
+        result = lock_object.PGLock.release(uuid, self.owner)
         if result is True:
             LOG.warning(_LW("Lock was already released on resource %s!"), uuid)
+            stats.expired(self)
         else:
             LOG.debug("Resource %(resource)s released "
                       "lock" % {'resource': self.uuid})
+        waiters.notify(uuid)
+        if self.parent is not None:
+            # A parent lock may be waiting for its nested locks
+            waiters.notify(self.parent, wake_all=True)
+
+    def verify(self):
+        """Check the lock is still held with its fencing token.
+
+        Raises TenantResourcesInUse once the lease was lost, somebody else
+        may have taken the resource since.
+        """
+        if self.token is None:
+            return
+        if self.lost or not lock_object.PGLock.owned(self.uuid, self.owner,
+                                                     self.token):
+            self.lost = True
+            raise exception.TenantResourcesInUse(
+                err_msg="Lock on resource " + self.uuid + " was lost. "
+                        "Please re-try")
 
     @contextlib.contextmanager
     def thread_lock(self, uuid):
@@ -123,7 +770,50 @@ class PGLock(object):
             result = self.try_acquire()
             yield result
         except:  # noqa
-            if result is None:  # Lock was successfully acquired
+            if result is not None:  # Lock was successfully acquired
                 with excutils.save_and_reraise_exception():
                     self.release(uuid)
             raise
+
+
+class PGLockSet(object):
+    """Locks on several resources taken as one.
+
+    The locks are taken in a canonical order, parent resources first and
+    then by uuid, so that operations locking overlapping sets of resources
+    can not deadlock. Resources already locked by the current operation,
+    or nested in a resource it has locked, are not locked again.
+
+    :param keys: resource uuids, or (uuid, parent) tuples for nested
+                 resources
+    """
+
+    def __init__(self, context, keys, ds=True, name=None):
+        keys = set(k if isinstance(k, tuple) else (k, None) for k in keys)
+        self.locks = [PGLock(context, uuid, ds, parent=parent, name=name)
+                      for uuid, parent in sorted(
+                          keys, key=lambda k: (k[1] is not None,
+                                               k[1] or "", k[0]))]
+
+    def acquire(self, blocking=True):
+        acquired = []
+        try:
+            for lock in self.locks:
+                lock.acquire(blocking)
+                acquired.append(lock)
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                for lock in reversed(acquired):
+                    lock.release(lock.uuid)
+
+    def release(self):
+        for lock in reversed(self.locks):
+            lock.release(lock.uuid)
+
+    @contextlib.contextmanager
+    def hold(self):
+        self.acquire()
+        try:
+            yield self
+        finally:
+            self.release()
@@ -18,7 +18,30 @@ PGLock object
 
 #from oslo_versionedobjects import fields
 
-from networking_plumgrid.neutron.plugins.db import api as db_api
+from oslo_config import cfg
+from oslo_utils import importutils
+
+_BACKEND_MAPPING = {
+    'db': 'networking_plumgrid.neutron.plugins.common.locking.backends.db.'
+          'DBLockBackend',
+    'mysql': 'networking_plumgrid.neutron.plugins.common.locking.backends.'
+             'mysql.MySQLLockBackend',
+    'file': 'networking_plumgrid.neutron.plugins.common.locking.backends.'
+            'file.FileLockBackend',
+    'memory': 'networking_plumgrid.neutron.plugins.common.locking.backends.'
+              'memory.MemoryLockBackend'}
+
+_backend = None
+
+
+def get_backend():
+    """Return the lock backend chosen by the lock_backend option."""
+    global _backend
+
+    if not _backend:
+        name = cfg.CONF.plumgriddirector.lock_backend
+        _backend = importutils.import_object(_BACKEND_MAPPING.get(name, name))
+    return _backend
 
 
 class PGLock(object):
@@ -28,21 +51,61 @@ class PGLock(object):
     #}
 
     @classmethod
-    def create(cls, uuid):
-        return db_api.pg_lock_create(uuid)
+    def setup(cls):
+        return get_backend().setup()
+
+    @classmethod
+    def create(cls, uuid, owner, lease, parent=None):
+        return get_backend().create(uuid, owner, lease, parent)
+
+    @classmethod
+    def held(cls, uuid, owners):
+        return get_backend().held(uuid, owners)
+
+    @classmethod
+    def children(cls, uuid, owners):
+        return get_backend().children(uuid, owners)
+
+    @classmethod
+    def sweep(cls, lease):
+        return get_backend().sweep(lease)
+
+    @classmethod
+    def enqueue(cls, uuid, owner, lease):
+        return get_backend().enqueue(uuid, owner, lease)
+
+    @classmethod
+    def queued(cls, uuid, ticket, lease):
+        return get_backend().queued(uuid, ticket, lease)
+
+    @classmethod
+    def dequeue(cls, ticket):
+        return get_backend().dequeue(ticket)
 
     @classmethod
     def get(cls, uuid):
-        return db_api.pg_lock_get(uuid)
+        return get_backend().get(uuid)
+
+    @classmethod
+    def owned(cls, uuid, owner, token):
+        return get_backend().owned(uuid, owner, token)
+
+    @classmethod
+    def handoff(cls, uuid, owner, new_owner, lease):
+        return get_backend().handoff(uuid, owner, new_owner, lease)
+
+    @classmethod
+    def renew(cls, owners, lease):
+        return get_backend().renew(owners, lease)
 
     @classmethod
     def steal(cls, uuid):
-        return db_api.pg_lock_steal(uuid)
+        return get_backend().steal(uuid)
 
     @classmethod
-    def release(cls, uuid):
-        return db_api.pg_lock_release(uuid)
+    def release(cls, uuid, owner=None):
+        return get_backend().release(uuid, owner)
 
     @classmethod
     def get_lock_id(cls, uuid):
-        return db_api.pg_lock_get_lock_id(uuid)
+        return get_backend().get_lock_id(uuid)
@@ -40,8 +40,36 @@ def get_session():
     return IMPL.get_session()
 
 
-def pg_lock_create(uuid):
-    return IMPL.pg_lock_create(uuid)
+def get_lock_engine():
+    return IMPL.get_lock_engine()
+
+
+def create_table_pg_lock():
+    return IMPL.create_table_pg_lock()
+
+
+def pg_lock_next_token(uuid):
+    return IMPL.pg_lock_next_token(uuid)
+
+
+def pg_lock_create(uuid, owner, lease, parent=None):
+    return IMPL.pg_lock_create(uuid, owner, lease, parent)
+
+
+def pg_lock_sweep(lease, limit=100):
+    return IMPL.pg_lock_sweep(lease, limit)
+
+
+def pg_lock_enqueue(uuid, owner, lease):
+    return IMPL.pg_lock_enqueue(uuid, owner, lease)
+
+
+def pg_lock_queued(uuid, ticket, lease):
+    return IMPL.pg_lock_queued(uuid, ticket, lease)
+
+
+def pg_lock_dequeue(ticket):
+    return IMPL.pg_lock_dequeue(ticket)
 
 
 def pg_lock_get(uuid):
@@ -52,9 +80,29 @@ def pg_lock_get_id(uuid):
     return IMPL.pg_lock_get_id(uuid)
 
 
+def pg_lock_held(uuid, owners):
+    return IMPL.pg_lock_held(uuid, owners)
+
+
+def pg_lock_children(uuid, owners):
+    return IMPL.pg_lock_children(uuid, owners)
+
+
+def pg_lock_owned(uuid, owner, token):
+    return IMPL.pg_lock_owned(uuid, owner, token)
+
+
+def pg_lock_handoff(uuid, owner, new_owner, lease):
+    return IMPL.pg_lock_handoff(uuid, owner, new_owner, lease)
+
+
+def pg_lock_renew(owners, lease):
+    return IMPL.pg_lock_renew(owners, lease)
+
+
 def pg_lock_steal(uuid):
     return IMPL.pg_lock_steal(uuid)
 
 
-def pg_lock_release(uuid):
-    return IMPL.pg_lock_release(uuid)
+def pg_lock_release(uuid, owner=None):
+    return IMPL.pg_lock_release(uuid, owner)
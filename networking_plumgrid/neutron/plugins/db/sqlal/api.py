@@ -11,13 +11,16 @@
 # limitations under the License.
 
 '''Implementation of SQLAlchemy backend.'''
+import datetime
 import sys
 
 from networking_plumgrid.neutron.plugins.common import exceptions as exception
 from networking_plumgrid.neutron.plugins.db.sqlal import models
 from neutron.i18n import _LW
 from oslo_config import cfg
+from oslo_db import exception as db_exc
 from oslo_db.sqlalchemy import session as db_session
+from oslo_utils import timeutils
 import sqlalchemy
 
 from oslo_log import log as logging
@@ -25,7 +28,29 @@ LOG = logging.getLogger(__name__)
 
 CONF = cfg.CONF
 
+# Fence row holding the highest token swept, no resource has this uuid
+_FENCE_FLOOR = 'pg-lock-fence-floor'
+
+lock_db_opts = [
+    cfg.StrOpt('lock_connection', secret=True,
+               help=_("SQLAlchemy connection string of the database "
+                      "holding the pg_lock table, defaults to the neutron "
+                      "database connection")),
+    cfg.IntOpt('lock_max_pool_size', default=5,
+               help=_("Maximum number of connections kept open to the "
+                      "lock database, lock traffic never uses the neutron "
+                      "connection pool")),
+    cfg.IntOpt('lock_max_overflow', default=10,
+               help=_("Number of connections to the lock database allowed "
+                      "above lock_max_pool_size")),
+    cfg.IntOpt('lock_pool_timeout', default=10,
+               help=_("Seconds to wait for a connection to the lock "
+                      "database"))]
+
+CONF.register_opts(lock_db_opts, "plumgriddirector")
+
 _facade = None
+_lock_facade = None
 
 
 def get_facade():
@@ -39,24 +64,97 @@ get_engine = lambda: get_facade().get_engine()
 get_session = lambda: get_facade().get_session()
 
 
+def get_lock_facade():
+    """Engine and sessions dedicated to the pg_lock table.
+
+    Lock retries and the operations holding the locks draw from different
+    connection pools, so that neither can starve the other. Sessions are
+    in autocommit mode: lookups run as a single statement, without a
+    transaction around them.
+    """
+    global _lock_facade
+
+    if not _lock_facade:
+        conf = CONF.plumgriddirector
+        _lock_facade = db_session.EngineFacade(
+            conf.lock_connection or CONF.database.connection,
+            autocommit=True,
+            expire_on_commit=False,
+            max_pool_size=conf.lock_max_pool_size,
+            max_overflow=conf.lock_max_overflow,
+            pool_timeout=conf.lock_pool_timeout,
+            max_retries=CONF.database.max_retries,
+            retry_interval=CONF.database.retry_interval)
+    return _lock_facade
+
+get_lock_engine = lambda: get_lock_facade().get_engine()
+get_lock_session = lambda: get_lock_facade().get_session()
+
+
 def create_table_pg_lock():
     try:
         meta = sqlalchemy.MetaData()
-        meta.bind = get_engine()
+        meta.bind = get_lock_engine()
 
         pg_lock = sqlalchemy.Table(
             'pg_lock', meta,
             sqlalchemy.Column('uuid', sqlalchemy.String(length=36),
                               primary_key=True,
                               nullable=False),
+            sqlalchemy.Column('parent', sqlalchemy.String(length=36),
+                              index=True),
+            sqlalchemy.Column('owner', sqlalchemy.String(length=255)),
+            sqlalchemy.Column('token', sqlalchemy.Integer),
+            sqlalchemy.Column('expires_at', sqlalchemy.DateTime, index=True),
+            sqlalchemy.Column('created_at', sqlalchemy.DateTime),
+            sqlalchemy.Column('updated_at', sqlalchemy.DateTime),
+            mysql_engine='InnoDB',
+            mysql_charset='utf8'
+        )
+        sqlalchemy.Table(
+            'pg_lock_fence', meta,
+            sqlalchemy.Column('uuid', sqlalchemy.String(length=36),
+                              primary_key=True,
+                              nullable=False),
+            sqlalchemy.Column('token', sqlalchemy.Integer, nullable=False),
+            sqlalchemy.Column('created_at', sqlalchemy.DateTime),
+            sqlalchemy.Column('updated_at', sqlalchemy.DateTime),
+            mysql_engine='InnoDB',
+            mysql_charset='utf8'
+        )
+        sqlalchemy.Table(
+            'pg_lock_queue', meta,
+            sqlalchemy.Column('id', sqlalchemy.Integer, primary_key=True,
+                              autoincrement=True),
+            sqlalchemy.Column('uuid', sqlalchemy.String(length=36),
+                              index=True),
+            sqlalchemy.Column('owner', sqlalchemy.String(length=255)),
+            sqlalchemy.Column('expires_at', sqlalchemy.DateTime, index=True),
             sqlalchemy.Column('created_at', sqlalchemy.DateTime),
             sqlalchemy.Column('updated_at', sqlalchemy.DateTime),
             mysql_engine='InnoDB',
             mysql_charset='utf8'
         )
-        pg_lock.create()
+        meta.create_all(checkfirst=True)
+        _add_missing_columns(meta.bind, pg_lock)
     except Exception:
-        pass
+        LOG.warning(_LW("Unable to create or upgrade the pg_lock table"),
+                    exc_info=True)
+
+
+def _add_missing_columns(engine, table):
+    """Bring a pg_lock table created by an older release up to date."""
+    inspector = sqlalchemy.inspect(engine)
+    columns = set(c['name'] for c in inspector.get_columns(table.name))
+    for column in table.columns:
+        if column.name not in columns:
+            engine.execute('ALTER TABLE %s ADD COLUMN %s %s' % (
+                table.name, column.name,
+                column.type.compile(dialect=engine.dialect)))
+    indexes = set(i['name'] for i in inspector.get_indexes(table.name))
+    for index in table.indexes:
+        if index.name not in indexes:
+            index.create(engine)
 
 
 def get_backend():
@@ -88,44 +186,247 @@ def _session(context):
     return (context and context.session) or get_session()
 
 
-def pg_lock_create(uuid):
+def _pg_lock_next_token(session, uuid):
+    rows_affected = session.query(models.PGLockFence).filter_by(
+        uuid=uuid).update({'token': models.PGLockFence.token + 1},
+                          synchronize_session=False)
+    if not rows_affected:
+        # The tokens of a swept fence carry on above the floor
+        floor = session.query(models.PGLockFence.token).filter_by(
+            uuid=_FENCE_FLOOR).with_for_update().scalar() or 0
+        session.add(models.PGLockFence(uuid=uuid, token=floor + 1))
+        return floor + 1
+    return session.query(models.PGLockFence.token).filter_by(
+        uuid=uuid).scalar()
+
+
+def pg_lock_next_token(uuid):
+    """Hand out the next fencing token of a resource locked elsewhere."""
+    session = get_lock_session()
+    with session.begin():
+        return _pg_lock_next_token(session, uuid)
+
+
+def pg_lock_create(uuid, owner, lease, parent=None):
+    """Take the lock on a resource for the given owner.
+
+    The lock of a resource nested in another one (a network of a tenant)
+    records its parent; the caller still needs to check the parent is not
+    locked once the lock is committed.
+
+    Taking a lock is one transaction: the insert, preceded by the update
+    and read of the resource's fencing token. An expired lock keeps its
+    resource locked until pg_lock_sweep deletes it.
+
+    Returns the fencing token of the new lock, or None if the lock is held
+    by somebody else.
+    """
+    session = get_lock_session()
+    expires_at = timeutils.utcnow() + datetime.timedelta(seconds=lease)
     try:
-        session = get_session()
         with session.begin():
-            lock = session.query(models.PGLock).get(uuid)
-            if lock is not None:
-                return lock.uuid
-            session.add(models.PGLock(uuid=uuid))
-            LOG.debug("Lock acquired for resource: " + uuid)
+            token = _pg_lock_next_token(session, uuid)
+            session.add(models.PGLock(uuid=uuid, parent=parent, owner=owner,
+                                      token=token, expires_at=expires_at))
+    except db_exc.DBDuplicateEntry:
+        return None
     except:  # noqa
         LOG.warning(_LW("Lock contest, sending back to re-try: %s"), uuid)
         raise exception.TenantResourcesInUse
+    LOG.debug("Lock acquired for resource: " + uuid)
+    return token
 
 
-def pg_lock_get(uuid):
+def pg_lock_sweep(lease, limit=100):
+    """Delete expired locks, at most limit of them per transaction.
+
+    Every neutron-server may sweep at the same time, a lock is only
+    deleted while it is still expired. The fencing tokens of resources
+    left unlocked for a lease are deleted too, such as those of locks
+    taken while creating a resource; the highest token deleted is kept as
+    the floor new fences start from, so tokens never go back. Returns the
+    number of locks deleted.
+    """
+    session = get_lock_session()
+    deleted = 0
+    while True:
+        now = timeutils.utcnow()
+        expired = sqlalchemy.or_(
+            models.PGLock.expires_at < now,
+            # Locks taken by a release without leases
+            sqlalchemy.and_(models.PGLock.expires_at.is_(None),
+                            models.PGLock.created_at <
+                            now - datetime.timedelta(seconds=lease)))
+        with session.begin():
+            uuids = [row.uuid for row in session.query(
+                models.PGLock.uuid).filter(expired).limit(limit)]
+            if uuids:
+                deleted += session.query(models.PGLock).filter(
+                    models.PGLock.uuid.in_(uuids), expired).delete(
+                    synchronize_session=False)
+        if len(uuids) < limit:
+            break
+    # Tickets of waiters which went away
+    with session.begin():
+        session.query(models.PGLockQueue).filter(
+            models.PGLockQueue.expires_at < now).delete(
+            synchronize_session=False)
+    # Fencing tokens of resources no longer locked, once the lease of the
+    # last token handed out is over
+    stale = sqlalchemy.and_(
+        models.PGLockFence.uuid != _FENCE_FLOOR,
+        sqlalchemy.func.coalesce(models.PGLockFence.updated_at,
+                                 models.PGLockFence.created_at) <
+        now - datetime.timedelta(seconds=lease),
+        ~sqlalchemy.exists().where(
+            models.PGLock.uuid == models.PGLockFence.uuid))
     try:
-        import datetime
-        current_time = datetime.datetime.utcnow()
-        two_min_ago = current_time - datetime.timedelta(minutes=2)
-        session = get_session()
         with session.begin():
-            res = session.query(models.PGLock).filter(
-                  models.PGLock.created_at < two_min_ago).all()
-            return res
+            top = session.query(
+                sqlalchemy.func.max(models.PGLockFence.token)).filter(
+                stale).scalar()
+            if top is not None:
+                floor = session.query(models.PGLockFence).filter_by(
+                    uuid=_FENCE_FLOOR).with_for_update().first()
+                if floor is None:
+                    session.add(models.PGLockFence(uuid=_FENCE_FLOOR,
+                                                   token=top))
+                elif floor.token < top:
+                    floor.token = top
+                session.query(models.PGLockFence).filter(
+                    stale, models.PGLockFence.token <= top).delete(
+                    synchronize_session=False)
+    except db_exc.DBDuplicateEntry:
+        # Another server set the floor first, its sweep covers these
+        pass
+    return deleted
+
+
+def pg_lock_enqueue(uuid, owner, lease):
+    """Take a ticket to wait for the lock on a resource in turn.
+
+    Returns the ticket, tickets increase in the order they are taken.
+    """
+    session = get_lock_session()
+    with session.begin():
+        ticket = models.PGLockQueue(
+            uuid=uuid, owner=owner,
+            expires_at=timeutils.utcnow() + datetime.timedelta(seconds=lease))
+        session.add(ticket)
+    return ticket.id
+
+
+def pg_lock_queued(uuid, ticket, lease):
+    """Check whether live tickets are ahead of ticket in the queue.
+
+    Any live ticket is ahead when ticket is None, otherwise the lease of
+    ticket is extended so that it lives as long as its holder polls.
+    """
+    session = get_lock_session()
+    now = timeutils.utcnow()
+    if ticket is not None:
+        session.query(models.PGLockQueue).filter_by(id=ticket).update(
+            {'expires_at': now + datetime.timedelta(seconds=lease)},
+            synchronize_session=False)
+    query = session.query(models.PGLockQueue.id).filter(
+        models.PGLockQueue.uuid == uuid,
+        models.PGLockQueue.expires_at > now)
+    if ticket is not None:
+        query = query.filter(models.PGLockQueue.id < ticket)
+    return query.first() is not None
+
+
+def pg_lock_dequeue(ticket):
+    session = get_lock_session()
+    with session.begin():
+        session.query(models.PGLockQueue).filter_by(id=ticket).delete(
+            synchronize_session=False)
+
+
+def pg_lock_get(uuid):
+    """Return the lock on a resource if its lease has expired."""
+    try:
+        session = get_lock_session()
+        res = session.query(models.PGLock).filter(
+            models.PGLock.uuid == uuid,
+            models.PGLock.expires_at < timeutils.utcnow()).all()
+        return res
     except:  # noqa
         return None
 
 
 def pg_lock_get_id(uuid):
-    session = get_session()
+    session = get_lock_session()
+    lock = session.query(models.PGLock).get(uuid)
+    if lock is not None:
+        return lock.uuid
+
+
+def pg_lock_held(uuid, owners):
+    """Check whether other owners hold a live lock on a resource."""
+    session = get_lock_session()
+    return session.query(models.PGLock.uuid).filter(
+        models.PGLock.uuid == uuid,
+        models.PGLock.owner.notin_(owners),
+        models.PGLock.expires_at > timeutils.utcnow()).first() is not None
+
+
+def pg_lock_children(uuid, owners):
+    """Count the live locks of other owners nested in a resource."""
+    session = get_lock_session()
+    return session.query(models.PGLock).filter(
+        models.PGLock.parent == uuid,
+        models.PGLock.owner.notin_(owners),
+        models.PGLock.expires_at > timeutils.utcnow()).count()
+
+
+def pg_lock_owned(uuid, owner, token):
+    """Whether owner still holds the live lock it took with token."""
+    session = get_lock_session()
+    return session.query(sqlalchemy.exists().where(sqlalchemy.and_(
+        models.PGLock.uuid == uuid, models.PGLock.owner == owner,
+        models.PGLock.token == token,
+        models.PGLock.expires_at > timeutils.utcnow()))).scalar()
+
+
+def pg_lock_handoff(uuid, owner, new_owner, lease):
+    """Hand a lock held by owner over to new_owner.
+
+    Returns the new fencing token, or None if owner lost the lock.
+    """
+    session = get_lock_session()
     with session.begin():
-        lock = session.query(models.PGLock).get(uuid)
-        if lock is not None:
-            return lock.uuid
+        now = timeutils.utcnow()
+        token = _pg_lock_next_token(session, uuid)
+        rows_affected = session.query(models.PGLock).filter_by(
+            uuid=uuid, owner=owner).update(
+            {'owner': new_owner, 'token': token,
+             'expires_at': now + datetime.timedelta(seconds=lease),
+             'created_at': now}, synchronize_session=False)
+    if rows_affected:
+        return token
+
+
+def pg_lock_renew(owners, lease):
+    """Extend the leases of the locks held by the given owners.
+
+    Returns the owners which no longer hold their lock.
+    """
+    session = get_lock_session()
+    with session.begin():
+        expires_at = timeutils.utcnow() + datetime.timedelta(seconds=lease)
+        rows_affected = session.query(models.PGLock).filter(
+            models.PGLock.owner.in_(owners)).update(
+            {'expires_at': expires_at}, synchronize_session=False)
+        if rows_affected == len(owners):
+            return set()
+        held = session.query(models.PGLock.owner).filter(
+            models.PGLock.owner.in_(owners)).all()
+    return set(owners) - set(row.owner for row in held)
 
 
 def pg_lock_steal(uuid):
-    session = get_session()
+    session = get_lock_session()
     with session.begin():
         rows_affected = session.query(
             models.PGLock
@@ -134,11 +435,12 @@ def pg_lock_steal(uuid):
         return True
 
 
-def pg_lock_release(uuid):
-    session = get_session()
+def pg_lock_release(uuid, owner=None):
+    session = get_lock_session()
     with session.begin():
-        rows_affected = session.query(
-            models.PGLock
-        ).filter_by(uuid=uuid).delete()
+        query = session.query(models.PGLock).filter_by(uuid=uuid)
+        if owner is not None:
+            query = query.filter_by(owner=owner)
+        rows_affected = query.delete()
     if not rows_affected:
         return True
@@ -90,3 +90,27 @@ class PGLock(BASE, PGBase):
 
     uuid = sqlalchemy.Column(sqlalchemy.String(36),
                              primary_key=True)
+    parent = sqlalchemy.Column(sqlalchemy.String(36), index=True)
+    owner = sqlalchemy.Column(sqlalchemy.String(255))
+    token = sqlalchemy.Column(sqlalchemy.Integer)
+    expires_at = sqlalchemy.Column(sqlalchemy.DateTime, index=True)
+
+
+class PGLockFence(BASE, PGBase):
+    """Last fencing token handed out for a lock resource."""
+    __tablename__ = 'pg_lock_fence'
+
+    uuid = sqlalchemy.Column(sqlalchemy.String(36),
+                             primary_key=True)
+    token = sqlalchemy.Column(sqlalchemy.Integer, nullable=False, default=0)
+
+
+class PGLockQueue(BASE, PGBase):
+    """Ticket of a lock waiting its turn, in fair locking mode."""
+    __tablename__ = 'pg_lock_queue'
+
+    id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True,
+                           autoincrement=True)
+    uuid = sqlalchemy.Column(sqlalchemy.String(36), index=True)
+    owner = sqlalchemy.Column(sqlalchemy.String(255))
+    expires_at = sqlalchemy.Column(sqlalchemy.DateTime, index=True)
@@ -0,0 +1,104 @@
+# Copyright 2016 PLUMgrid, Inc. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Future returning proxy over a PLUMgrid driver
+"""
+
+from concurrent import futures
+import os
+import threading
+
+from oslo_config import cfg
+
+from networking_plumgrid.neutron.plugins.common.locking import lock as pg_lock
+
+async_opts = [
+    cfg.IntOpt('director_async_workers', default=8,
+               help=_("Number of director calls issued concurrently by "
+                      "operations that overlap their independent calls"))]
+
+cfg.CONF.register_opts(async_opts, "plumgriddirector")
+
+
+class AsyncPlumlib(object):
+    """Issue the calls of a PLUMgrid driver without waiting for them.
+
+    Every driver method returns a concurrent.futures.Future. The workers
+    are green threads when eventlet has patched threading, and asyncio
+    callers can await a call through asyncio.wrap_future.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self._mutex = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def _get_executor(self):
+        with self._mutex:
+            # The workers of the parent do not survive a fork
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._executor = futures.ThreadPoolExecutor(
+                    cfg.CONF.plumgriddirector.director_async_workers)
+            return self._executor
+
+    def submit(self, method, *args, **kwargs):
+        """Call a driver method in the background, return its future."""
+        # The workers hold no locks, check those of the caller
+        pg_lock.verify_held()
+        return self._get_executor().submit(getattr(self.driver, method),
+                                           *args, **kwargs)
+
+    def group(self):
+        """Return a group of calls joined together."""
+        return CallGroup(self)
+
+    def __getattr__(self, name):
+        if not callable(getattr(self.driver, name)):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            return self.submit(name, *args, **kwargs)
+        return call
+
+
+class CallGroup(object):
+    """Independent director calls issued together and joined as one."""
+
+    def __init__(self, proxy):
+        self.proxy = proxy
+        self.futures = []
+
+    def __getattr__(self, name):
+        method = getattr(self.proxy, name)
+
+        def call(*args, **kwargs):
+            future = method(*args, **kwargs)
+            self.futures.append(future)
+            return future
+        return call
+
+    def wait(self):
+        """Wait for all the calls of the group to finish."""
+        futures.wait(self.futures)
+
+    def join(self):
+        """Wait for all the calls, raise the error of the first that failed.
+
+        Returns the results of the calls in the order they were issued.
+        """
+        self.wait()
+        return [future.result() for future in self.futures]
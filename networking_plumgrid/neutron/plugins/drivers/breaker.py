@@ -0,0 +1,157 @@
+# Copyright 2016 PLUMgrid, Inc. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Circuit breaker for the calls made to the PLUMgrid Director
+"""
+
+import contextlib
+import threading
+import time
+
+from neutron.i18n import _LI, _LW
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from networking_plumgrid.neutron.plugins.common import exceptions as p_exc
+from networking_plumgrid.neutron.plugins.drivers import director_pool
+
+LOG = logging.getLogger(__name__)
+
+breaker_opts = [
+    cfg.IntOpt('director_breaker_threshold', default=5,
+               help=_("Number of director calls in a row failing to reach "
+                      "the PLUMgrid Director, or timing out, after which "
+                      "calls fail right away instead of waiting for the "
+                      "director. 0 disables the circuit breaker")),
+    cfg.FloatOpt('director_breaker_reset_timeout', default=30,
+                 help=_("Seconds calls fail right away once the breaker "
+                        "tripped, before a trial call checks whether the "
+                        "director is back"))]
+
+cfg.CONF.register_opts(breaker_opts, "plumgriddirector")
+
+# Failures showing the director cannot be reached, other errors come from
+# a director which answered
+OUTAGE_ERRORS = director_pool.CONNECTION_ERRORS + (p_exc.PLUMgridCallTimeout,)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitBreaker(object):
+    """Fail director calls right away while the director is unreachable.
+
+    The breaker trips open after director_breaker_threshold calls in a row
+    failed to reach the director. Calls then fail immediately until
+    director_breaker_reset_timeout elapsed, when the breaker is half-open
+    and lets a single trial call through: the breaker closes if the
+    director answers and opens again otherwise.
+    """
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._trips = 0
+
+    def _admit(self, method):
+        """Return whether the call is a trial, raise when it may not run."""
+        with self._mutex:
+            if self._state == CLOSED:
+                return False
+            if (self._state == OPEN and time.time() - self._opened_at >=
+                    cfg.CONF.plumgriddirector.director_breaker_reset_timeout):
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN and not self._trial:
+                self._trial = True
+                return True
+            failures = self._failures
+        raise p_exc.PLUMgridDirectorUnavailable(
+            err_msg="%s not sent, the last %d director calls failed" %
+            (method, failures))
+
+    def _succeeded(self, trial):
+        with self._mutex:
+            if trial:
+                self._trial = False
+            if self._state == HALF_OPEN and trial:
+                LOG.info(_LI("PLUMgrid Director reachable again, director "
+                             "calls resumed"))
+                self._state = CLOSED
+            if self._state == CLOSED:
+                self._failures = 0
+
+    def _failed(self, trial):
+        conf = cfg.CONF.plumgriddirector
+        with self._mutex:
+            if trial:
+                self._trial = False
+            self._failures += 1
+            if trial or (self._state == CLOSED and
+                         self._failures >= conf.director_breaker_threshold):
+                if self._state == CLOSED:
+                    self._trips += 1
+                    LOG.warning(_LW("PLUMgrid Director unreachable after "
+                                    "%(failures)d failed calls, director "
+                                    "calls fail right away for %(reset)ss"),
+                                {'failures': self._failures,
+                                 'reset': conf.director_breaker_reset_timeout})
+                self._state = OPEN
+                self._opened_at = time.time()
+
+    def _abandoned(self, trial):
+        if trial:
+            with self._mutex:
+                self._trial = False
+
+    @contextlib.contextmanager
+    def guard(self, method):
+        """Run the director call of the block unless the breaker is open."""
+        if cfg.CONF.plumgriddirector.director_breaker_threshold <= 0:
+            yield
+            return
+        trial = self._admit(method)
+        try:
+            yield
+        except OUTAGE_ERRORS:
+            self._failed(trial)
+            raise
+        except Exception:
+            self._succeeded(trial)
+            raise
+        except BaseException:
+            self._abandoned(trial)
+            raise
+        else:
+            self._succeeded(trial)
+
+    def state(self):
+        """Return the state of the breaker."""
+        with self._mutex:
+            return {'state': self._state, 'failures': self._failures,
+                    'opened_at': self._opened_at, 'trips': self._trips}
+
+    def reset(self):
+        """Close the breaker."""
+        with self._mutex:
+            self._state = CLOSED
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+breaker = CircuitBreaker()
@@ -0,0 +1,127 @@
+# Copyright 2016 PLUMgrid, Inc. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Log of the calls made to the PLUMgrid Director, for recording and replay
+"""
+
+import os
+import threading
+
+from oslo_config import cfg
+from oslo_serialization import jsonutils
+import six
+
+from networking_plumgrid.neutron.plugins.common import exceptions as p_exc
+
+call_log_opts = [
+    cfg.StrOpt('director_call_log',
+               help=_("File the recording driver appends the director calls "
+                      "to, one JSON record per line, and the replay driver "
+                      "reads them from")),
+    cfg.FloatOpt('director_replay_scale', default=1.0,
+                 help=_("Factor applied to the recorded latencies of the "
+                        "director calls by the replay driver, 0 replays "
+                        "them without delay"))]
+
+cfg.CONF.register_opts(call_log_opts, "plumgriddirector")
+
+# Recorded in place of the arguments holding credentials
+REDACTED = '***'
+
+
+def log_path():
+    """Return the path of the call log, which must be configured."""
+    path = cfg.CONF.plumgriddirector.director_call_log
+    if not path:
+        raise p_exc.PLUMgridException(
+            err_msg="director_call_log is not set, the recording and "
+                    "replay drivers need it")
+    return path
+
+
+def secret(name):
+    """Tell whether an argument name is that of a credential."""
+    return 'password' in name or 'secret' in name
+
+
+def redact(fn, args, kwargs):
+    """Return the arguments of a call to fn without their credentials.
+
+    Arguments are masked by name, such as the director and switch
+    passwords given to create_l2_gateway.
+    """
+    names = ()
+    if fn is not None:
+        code = six.get_function_code(six.get_unbound_function(fn))
+        # Without self
+        names = code.co_varnames[1:code.co_argcount]
+    args = tuple(REDACTED if i < len(names) and secret(names[i]) else arg
+                 for i, arg in enumerate(args))
+    kwargs = dict((name, REDACTED if secret(name) else arg)
+                  for name, arg in kwargs.items())
+    return args, kwargs
+
+
+def primitive(value):
+    """Return a JSON serializable form of a director call argument."""
+    try:
+        # DB models iterate over their columns
+        return dict(value)
+    except (TypeError, ValueError):
+        return six.text_type(value)
+
+
+def encode(record):
+    """Return the log line of a call record."""
+    return jsonutils.dumps(record, default=primitive,
+                           separators=(',', ':')) + "\n"
+
+
+class CallLog(object):
+    """Append-only log of director calls.
+
+    Every record is one line holding the method, its arguments, its
+    latency in seconds and either its result or its error.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._mutex = threading.Lock()
+        self._file = None
+        self._pid = None
+
+    def append(self, method, args, kwargs, latency, result=None,
+               error=None):
+        record = {'method': method, 'args': args, 'kwargs': kwargs,
+                  'latency': round(latency, 6), 'result': result}
+        if error is not None:
+            record['error'] = [type(error).__name__, six.text_type(error)]
+        self.write(record)
+
+    def write(self, record):
+        """Append a record to the log."""
+        line = encode(record)
+        with self._mutex:
+            # Workers forked by neutron-server reopen the log
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._file = open(self.path, 'a')
+            self._file.write(line)
+            self._file.flush()
+
+    def records(self):
+        """Return the records of the log in order."""
+        with open(self.path) as f:
+            return [jsonutils.loads(line) for line in f if line.strip()]
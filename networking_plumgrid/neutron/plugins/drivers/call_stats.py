@@ -0,0 +1,124 @@
+# Copyright 2016 PLUMgrid, Inc. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Latency and error statistics of the calls made to the PLUMgrid Director
+"""
+
+import bisect
+import contextlib
+import threading
+import time
+
+from neutron.i18n import _LI
+from oslo_log import log as logging
+
+LOG = logging.getLogger(__name__)
+
+
+class CallStats(object):
+    """Latency and error statistics of director calls by proxy method.
+
+    Every method keeps its calls in flight, completed calls, a latency
+    histogram and the errors it raised by exception type.
+    """
+
+    # Upper bounds in seconds of the latency histogram buckets, the last
+    # bucket holds the slower calls
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._stats = {}
+
+    def _get(self, method):
+        stats = self._stats.get(method)
+        if stats is None:
+            stats = self._stats[method] = {
+                'in_flight': 0, 'calls': 0, 'latency_total': 0,
+                'latency_max': 0, 'histogram': [0] * (len(self.BUCKETS) + 1),
+                'errors': {}}
+        return stats
+
+    @contextlib.contextmanager
+    def track(self, method):
+        """Record the director call made by the block."""
+        with self._mutex:
+            self._get(method)['in_flight'] += 1
+        started = time.time()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            latency = time.time() - started
+            with self._mutex:
+                stats = self._get(method)
+                stats['in_flight'] -= 1
+                stats['calls'] += 1
+                stats['latency_total'] += latency
+                stats['latency_max'] = max(stats['latency_max'], latency)
+                stats['histogram'][bisect.bisect_left(self.BUCKETS,
+                                                      latency)] += 1
+                if error is not None:
+                    stats['errors'][error] = stats['errors'].get(error,
+                                                                 0) + 1
+
+    def snapshot(self, method=None):
+        """Return the statistics by method, or those of one method.
+
+        The average latency is computed for every method.
+        """
+        with self._mutex:
+            result = {}
+            for name, stats in self._stats.items():
+                if method is not None and name != method:
+                    continue
+                stats = dict(stats, histogram=list(stats['histogram']),
+                             errors=dict(stats['errors']))
+                stats['latency_avg'] = (stats['latency_total'] /
+                                        max(stats['calls'], 1))
+                result[name] = stats
+        return result.get(method, {}) if method is not None else result
+
+    def dump(self):
+        """Log the statistics of every method."""
+        bounds = ["<=%ss" % bound for bound in self.BUCKETS] + [
+            ">%ss" % self.BUCKETS[-1]]
+        for method, stats in sorted(self.snapshot().items()):
+            LOG.info(_LI("Director call %(method)s: %(calls)d calls, "
+                         "%(in_flight)d in flight, latency avg %(avg).3fs "
+                         "max %(max).3fs, histogram %(histogram)s, "
+                         "errors %(errors)s"),
+                     {'method': method, 'calls': stats['calls'],
+                      'in_flight': stats['in_flight'],
+                      'avg': stats['latency_avg'],
+                      'max': stats['latency_max'],
+                      'histogram': ", ".join(
+                          "%s: %d" % (bound, count)
+                          for bound, count in zip(bounds, stats['histogram'])
+                          if count),
+                      'errors': stats['errors'] or "none"})
+
+    def reset(self):
+        """Clear the statistics, the calls in flight are kept."""
+        with self._mutex:
+            for method in list(self._stats):
+                in_flight = self._stats.pop(method)['in_flight']
+                if in_flight:
+                    self._get(method)['in_flight'] = in_flight
+
+stats = CallStats()
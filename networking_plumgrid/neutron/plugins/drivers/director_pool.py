@@ -0,0 +1,250 @@
+# Copyright 2015 PLUMgrid, Inc. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Pool of the PLUMgrid Director nodes of a cluster
+"""
+
+import collections
+import contextlib
+import errno
+import os
+import socket
+import threading
+import time
+
+from neutron.i18n import _LI, _LW
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from networking_plumgrid.neutron.plugins.common import exceptions as p_exc
+
+LOG = logging.getLogger(__name__)
+
+director_pool_opts = [
+    cfg.ListOpt('director_servers', default=[],
+                help=_("PLUMgrid Director nodes of the cluster as host:port "
+                       "pairs, defaults to director_server and "
+                       "director_server_port")),
+    cfg.IntOpt('director_health_interval', default=10,
+               help=_("Seconds between health checks of the PLUMgrid "
+                      "Director nodes, 0 disables them")),
+    cfg.IntOpt('director_pool_size', default=4,
+               help=_("Number of idle connected clients kept per PLUMgrid "
+                      "Director node by each neutron-server worker. More "
+                      "concurrent calls open extra clients which are "
+                      "closed after use")),
+    cfg.IntOpt('director_idle_timeout', default=60,
+               help=_("Seconds after which an idle director client is "
+                      "closed instead of being reused"))]
+
+cfg.CONF.register_opts(director_pool_opts, "plumgriddirector")
+
+# Errors meaning the director could not be reached, or stopped answering
+CONNECTION_ERRORS = (IOError, socket.error, p_exc.PLUMgridConnectionFailed)
+
+# Errors of a connection which could not be set up
+CONNECT_ERRNOS = frozenset([errno.ECONNREFUSED, errno.EHOSTUNREACH,
+                            errno.ENETUNREACH, errno.EADDRNOTAVAIL])
+# Errors of HTTP libraries raised before the request is sent
+CONNECT_ERROR_NAMES = frozenset(['ConnectTimeout', 'NewConnectionError'])
+
+
+def not_sent(error):
+    """Return whether error shows the request never reached the director.
+
+    Only such failures may be sent again, to this director or another one:
+    a request failing once sent, e.g. on a read timeout, may have been
+    applied by the director.
+    """
+    for i in range(4):
+        if isinstance(error, p_exc.PLUMgridConnectionFailed):
+            # Raised by the pool when no director could be connected to
+            return True
+        if isinstance(error, socket.timeout):
+            return False
+        if (type(error).__name__ in CONNECT_ERROR_NAMES or
+                getattr(error, 'errno', None) in CONNECT_ERRNOS):
+            return True
+        # HTTP libraries wrap the socket error
+        cause = getattr(error, 'reason', None)
+        if cause is None and error.args:
+            cause = error.args[0]
+        if not isinstance(cause, BaseException):
+            return False
+        error = cause
+    return False
+
+
+class Endpoint(object):
+    """A PLUMgrid Director node and its idle clients."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.healthy = True
+        # Moving average of the health check latency in seconds
+        self.latency = None
+        # (client, time it was last used), most recently used last
+        self.idle = collections.deque()
+
+    def __str__(self):
+        return "%s:%s" % (self.host, self.port)
+
+    def get(self, idle_timeout):
+        """Return the most recently used live idle client, if any."""
+        if self.idle:
+            client, used = self.idle.pop()
+            if used >= time.time() - idle_timeout:
+                return client
+            # The other clients have been idle even longer
+            self.idle.clear()
+        return None
+
+    def put(self, client, size):
+        if len(self.idle) < size:
+            self.idle.append((client, time.time()))
+
+
+class DirectorPool(object):
+    """PLUMgrid Director nodes, healthiest and fastest first.
+
+    Calls go to the node answering health checks the fastest and fail over
+    to the next one when a node can not be reached. Nodes are checked in
+    the background with a TCP connection to their API port.
+
+    Clients are pooled per node, so that calls reuse their logged in
+    sessions and kept alive connections instead of setting up new ones.
+
+    :param connect: function creating the client of a node from its host
+                    and port
+    """
+
+    def __init__(self, endpoints, connect, timeout):
+        self.endpoints = endpoints
+        self._connect = connect
+        self.timeout = timeout
+        self._mutex = threading.Lock()
+        self._pid = None
+
+    @classmethod
+    def from_config(cls, director_server, director_port, connect, timeout):
+        endpoints = []
+        for server in cfg.CONF.plumgriddirector.director_servers:
+            host, sep, port = server.rpartition(':')
+            if not sep:
+                host, port = server, director_port
+            endpoints.append(Endpoint(host, int(port)))
+        if not endpoints:
+            endpoints.append(Endpoint(director_server, int(director_port)))
+        return cls(endpoints, connect, timeout)
+
+    def ordered(self):
+        """Return the nodes in the order they should be tried."""
+        self._start()
+        return sorted(self.endpoints,
+                      key=lambda e: (not e.healthy, e.latency is None,
+                                     e.latency))
+
+    @contextlib.contextmanager
+    def client(self, endpoint):
+        """Check a client of a node out of its pool."""
+        conf = cfg.CONF.plumgriddirector
+        with self._mutex:
+            client = endpoint.get(conf.director_idle_timeout)
+        if client is None:
+            try:
+                client = self._connect(endpoint.host, endpoint.port)
+            except CONNECTION_ERRORS as e:
+                # No call was sent yet
+                raise p_exc.PLUMgridConnectionFailed(err_msg=e)
+        try:
+            yield client
+        except CONNECTION_ERRORS + (p_exc.PLUMgridCallTimeout,):
+            # Drop the client, its connection may be broken, hold a half
+            # read answer or still be used by the native thread of the call
+            raise
+        except Exception:
+            # The director answered with an error
+            self._checkin(endpoint, client)
+            raise
+        # Interrupted calls (BaseException) do not get here and drop their
+        # client as well
+        self._checkin(endpoint, client)
+
+    def _checkin(self, endpoint, client):
+        with self._mutex:
+            endpoint.put(client, cfg.CONF.plumgriddirector.director_pool_size)
+
+    def call(self, fn):
+        """Call fn with the client of the best node, failing over to the
+        other nodes when a node can not be connected to.
+
+        A call failing once sent is not sent to another node, it may have
+        been applied by the first one.
+        """
+        error = None
+        for endpoint in self.ordered():
+            try:
+                with self.client(endpoint) as client:
+                    return fn(client)
+            except CONNECTION_ERRORS as e:
+                error = e
+                self.failed(endpoint, e)
+                if not not_sent(e):
+                    raise
+        raise p_exc.PLUMgridConnectionFailed(err_msg=error)
+
+    def failed(self, endpoint, error):
+        LOG.warning(_LW("PLUMgrid Director %(director)s failed: %(error)s"),
+                    {'director': endpoint, 'error': error})
+        endpoint.healthy = False
+        with self._mutex:
+            endpoint.idle.clear()
+
+    def _start(self):
+        if (len(self.endpoints) < 2 or
+                cfg.CONF.plumgriddirector.director_health_interval <= 0):
+            return
+        with self._mutex:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            thread = threading.Thread(target=self._run)
+            thread.daemon = True
+            thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(cfg.CONF.plumgriddirector.director_health_interval)
+            for endpoint in self.endpoints:
+                self.check(endpoint)
+
+    def check(self, endpoint):
+        start = time.time()
+        try:
+            socket.create_connection((endpoint.host, endpoint.port),
+                                     self.timeout).close()
+        except socket.error as e:
+            if endpoint.healthy:
+                self.failed(endpoint, e)
+            return
+        latency = time.time() - start
+        if endpoint.latency is None:
+            endpoint.latency = latency
+        else:
+            endpoint.latency += 0.3 * (latency - endpoint.latency)
+        if not endpoint.healthy:
+            LOG.info(_LI("PLUMgrid Director %s is back"), endpoint)
+            endpoint.healthy = True
@@ -0,0 +1,103 @@
+# Copyright 2016 PLUMgrid, Inc. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Native thread pool for the blocking I/O of the PLUMgrid Director library
+"""
+
+import threading
+
+from eventlet import tpool
+from oslo_config import cfg
+
+native_opts = [
+    cfg.BoolOpt('director_native_threads', default=False,
+                help=_("Run the PLUMgrid Director library calls on native "
+                       "threads, so a director blocking the library in C "
+                       "socket or TLS calls only blocks the request "
+                       "waiting for it instead of the whole worker")),
+    cfg.IntOpt('director_native_pool_size', default=8,
+               help=_("Number of native threads running director calls "
+                      "in each neutron-server worker, further calls "
+                      "queue for a thread"))]
+
+cfg.CONF.register_opts(native_opts, "plumgriddirector")
+
+
+class NativePool(object):
+    """Bounded pool of native threads running director calls.
+
+    The calls run on the eventlet tpool, the green thread of the request
+    waits for its call without blocking the hub. The pool keeps the depth
+    of its queue: calls waiting for a thread, calls running, the deepest
+    queue seen and the calls completed.
+    """
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._slots = None
+        self.queued = 0
+        self.running = 0
+        self.peak_queued = 0
+        self.calls = 0
+
+    def _get_slots(self):
+        with self._mutex:
+            if self._slots is None:
+                size = cfg.CONF.plumgriddirector.director_native_pool_size
+                # Only effective before the first call through the tpool
+                tpool.set_num_threads(size)
+                self._slots = threading.BoundedSemaphore(size)
+            return self._slots
+
+    def execute(self, fn, *args, **kwargs):
+        """Call fn on a native thread when enabled, in line otherwise."""
+        if not cfg.CONF.plumgriddirector.director_native_threads:
+            return fn(*args, **kwargs)
+        slots = self._get_slots()
+        if not slots.acquire(False):
+            # Only calls waiting for a thread count as queued
+            with self._mutex:
+                self.queued += 1
+                self.peak_queued = max(self.peak_queued, self.queued)
+            try:
+                slots.acquire()
+            finally:
+                with self._mutex:
+                    self.queued -= 1
+        try:
+            with self._mutex:
+                self.running += 1
+            try:
+                return tpool.execute(fn, *args, **kwargs)
+            finally:
+                with self._mutex:
+                    self.running -= 1
+                    self.calls += 1
+        finally:
+            slots.release()
+
+    def snapshot(self):
+        """Return the queue depth of the pool."""
+        with self._mutex:
+            return {'queued': self.queued, 'running': self.running,
+                    'peak_queued': self.peak_queued, 'calls': self.calls}
+
+    def reset(self):
+        """Reset the deepest queue and completed calls counters."""
+        with self._mutex:
+            self.peak_queued = self.queued
+            self.calls = 0
+
+pool = NativePool()
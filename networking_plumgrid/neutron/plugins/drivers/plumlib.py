@@ -20,6 +20,14 @@ from neutron.i18n import _LI
 from oslo_log import log as logging
 from plumgridlib import plumlib
 
+from networking_plumgrid.neutron.plugins.common.locking import lock as pg_lock
+from networking_plumgrid.neutron.plugins.drivers import breaker
+from networking_plumgrid.neutron.plugins.drivers import call_stats
+from networking_plumgrid.neutron.plugins.drivers import director_pool
+from networking_plumgrid.neutron.plugins.drivers import native_pool
+from networking_plumgrid.neutron.plugins.drivers import retries
+from networking_plumgrid.neutron.plugins.drivers import watchdog
+
 LOG = logging.getLogger(__name__)
 
 
@@ -35,83 +43,103 @@ class Plumlib(object):
 
     def director_conn(self, director_plumgrid, director_port, timeout,
                       director_admin, director_password):
-        self.plumlib = plumlib.Plumlib(director_plumgrid,
-                                       director_port,
-                                       timeout,
-                                       director_admin,
-                                       director_password)
+        def connect(host, port):
+            return native_pool.pool.execute(plumlib.Plumlib, host, port,
+                                            timeout, director_admin,
+                                            director_password)
+
+        self.directors = director_pool.DirectorPool.from_config(
+            director_plumgrid, director_port, connect, timeout)
+        # Connect to a director right away
+        self.directors.call(lambda client: client)
+
+    def _call(self, method, *args, **kwargs):
+        def call(client):
+            return native_pool.pool.execute(getattr(client, method),
+                                            *args, **kwargs)
+
+        def attempt():
+            # Nothing is sent under a lock whose lease was lost
+            pg_lock.verify_held()
+            with breaker.breaker.guard(method), \
+                    watchdog.watchdog.watch(method):
+                return self.directors.call(call)
+
+        with call_stats.stats.track(method):
+            return retries.call(attempt, method, args, kwargs)
 
     def create_network(self, tenant_id, net_db, network, **kwargs):
-        self.plumlib.create_network(tenant_id, net_db, network, **kwargs)
+        self._call("create_network", tenant_id, net_db, network, **kwargs)
 
     def update_network(self, tenant_id, net_id, network, orig_net_db):
-        self.plumlib.update_network(tenant_id, net_id, network, orig_net_db)
+        self._call("update_network", tenant_id, net_id, network, orig_net_db)
 
     def delete_network(self, net_db, net_id):
-        self.plumlib.delete_network(net_db, net_id)
+        self._call("delete_network", net_db, net_id)
 
     def create_subnet(self, sub_db, net_db, ipnet):
-        self.plumlib.create_subnet(sub_db, net_db, ipnet)
+        self._call("create_subnet", sub_db, net_db, ipnet)
 
     def update_subnet(self, orig_sub_db, new_sub_db, ipnet, net_db):
-        self.plumlib.update_subnet(orig_sub_db, new_sub_db, ipnet, net_db)
+        self._call("update_subnet", orig_sub_db, new_sub_db, ipnet, net_db)
 
     def delete_subnet(self, tenant_id, net_db, net_id):
-        self.plumlib.delete_subnet(tenant_id, net_db, net_id)
+        self._call("delete_subnet", tenant_id, net_db, net_id)
 
     def create_port(self, port_db, router_db):
-        self.plumlib.create_port(port_db, router_db)
+        self._call("create_port", port_db, router_db)
 
     def update_port(self, port_db, router_db):
-        self.plumlib.update_port(port_db, router_db)
+        self._call("update_port", port_db, router_db)
 
     def delete_port(self, port_db, router_db):
-        self.plumlib.delete_port(port_db, router_db)
+        self._call("delete_port", port_db, router_db)
 
     def create_router(self, tenant_id, router_db):
-        self.plumlib.create_router(tenant_id, router_db)
+        self._call("create_router", tenant_id, router_db)
 
     def update_router(self, router_db, router_id):
-        self.plumlib.update_router(router_db, router_id)
+        self._call("update_router", router_db, router_id)
 
     def delete_router(self, tenant_id, router_id):
-        self.plumlib.delete_router(tenant_id, router_id)
+        self._call("delete_router", tenant_id, router_id)
 
     def add_router_interface(self, tenant_id, router_id, port_db, ipnet):
-        self.plumlib.add_router_interface(tenant_id, router_id, port_db, ipnet)
+        self._call("add_router_interface", tenant_id, router_id, port_db,
+                   ipnet)
 
     def remove_router_interface(self, tenant_id, net_id, router_id):
-        self.plumlib.remove_router_interface(tenant_id, net_id, router_id)
+        self._call("remove_router_interface", tenant_id, net_id, router_id)
 
     def create_floatingip(self, floating_ip):
-        self.plumlib.create_floatingip(floating_ip)
+        self._call("create_floatingip", floating_ip)
 
     def update_floatingip(self, floating_ip_orig, floating_ip, id):
-        self.plumlib.update_floatingip(floating_ip_orig, floating_ip, id)
+        self._call("update_floatingip", floating_ip_orig, floating_ip, id)
 
     def delete_floatingip(self, floating_ip_orig, id):
-        self.plumlib.delete_floatingip(floating_ip_orig, id)
+        self._call("delete_floatingip", floating_ip_orig, id)
 
     def disassociate_floatingips(self, floating_ip, port_id):
-        self.plumlib.disassociate_floatingips(floating_ip, port_id)
+        self._call("disassociate_floatingips", floating_ip, port_id)
 
     def create_security_group(self, sg_db):
-        self.plumlib.create_security_group(sg_db)
+        self._call("create_security_group", sg_db)
 
     def update_security_group(self, sg_db):
-        self.plumlib.update_security_group(sg_db)
+        self._call("update_security_group", sg_db)
 
     def delete_security_group(self, sg_db):
-        self.plumlib.delete_security_group(sg_db)
+        self._call("delete_security_group", sg_db)
 
     def create_security_group_rule(self, sg_rule_db):
-        self.plumlib.create_security_group_rule(sg_rule_db)
+        self._call("create_security_group_rule", sg_rule_db)
 
     def create_security_group_rule_bulk(self, sg_rule_db):
-        self.plumlib.create_security_group_rule_bulk(sg_rule_db)
+        self._call("create_security_group_rule_bulk", sg_rule_db)
 
     def delete_security_group_rule(self, sg_rule_db):
-        self.plumlib.delete_security_group_rule(sg_rule_db)
+        self._call("delete_security_group_rule", sg_rule_db)
 
     def create_l2_gateway(self, director_plumgrid,
                           director_admin,
@@ -120,42 +148,44 @@ class Plumlib(object):
                           vendor_type,
                           sw_username,
                           sw_password):
-        self.plumlib.create_l2_gateway(director_plumgrid,
-                                       director_admin,
-                                       director_password,
-                                       gateway_info,
-                                       vendor_type,
-                                       sw_username,
-                                       sw_password)
+        self._call("create_l2_gateway", director_plumgrid,
+                   director_admin,
+                   director_password,
+                   gateway_info,
+                   vendor_type,
+                   sw_username,
+                   sw_password)
 
     def delete_l2_gateway(self, gw_info):
-        self.plumlib.delete_l2_gateway(gw_info)
+        self._call("delete_l2_gateway", gw_info)
 
     def add_l2_gateway_connection(self, gw_conn_info):
-        self.plumlib.add_l2_gateway_connection(gw_conn_info)
+        self._call("add_l2_gateway_connection", gw_conn_info)
 
     def delete_l2_gateway_connection(self, gw_conn_info):
-        self.plumlib.delete_l2_gateway_connection(gw_conn_info)
+        self._call("delete_l2_gateway_connection", gw_conn_info)
 
     def create_physical_attachment_point(self, physical_attachment_point):
-        self.plumlib.create_physical_attachment_point(
-                     physical_attachment_point)
+        self._call("create_physical_attachment_point",
+                   physical_attachment_point)
 
     def update_physical_attachment_point(self, physical_attachment_point):
-        self.plumlib.update_physical_attachment_point(
-                     physical_attachment_point)
+        self._call("update_physical_attachment_point",
+                   physical_attachment_point)
 
     def delete_physical_attachment_point(self, pap_id):
-        self.plumlib.delete_physical_attachment_point(pap_id)
+        self._call("delete_physical_attachment_point", pap_id)
 
     def create_transit_domain(self, transit_domain, transit_domain_data):
-        self.plumlib.create_transit_domain(transit_domain, transit_domain_data)
+        self._call("create_transit_domain", transit_domain,
+                   transit_domain_data)
 
     def update_transit_domain(self, transit_domain, transit_domain_data):
-        self.plumlib.update_transit_domain(transit_domain, transit_domain_data)
+        self._call("update_transit_domain", transit_domain,
+                   transit_domain_data)
 
     def delete_transit_domain(self, tvd_id):
-        self.plumlib.delete_transit_domain(tvd_id)
+        self._call("delete_transit_domain", tvd_id)
 
     def get_available_interface(self):
-        return self.plumlib.get_phyattpoint_available_interface()
+        return self._call("get_phyattpoint_available_interface")
@@ -0,0 +1,52 @@
+# Copyright 2016 PLUMgrid, Inc. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import time
+
+from neutron.i18n import _LI
+from oslo_log import log as logging
+
+from networking_plumgrid.neutron.plugins.drivers import call_log
+from networking_plumgrid.neutron.plugins.drivers import plumlib
+
+LOG = logging.getLogger(__name__)
+
+
+class Plumlib(plumlib.Plumlib):
+    """Class PLUMgrid Recording Library.
+
+    This library calls the PLUMgrid Director through the PLUMgrid Library
+    proxy and records every call, with its latency and its outcome, to
+    director_call_log for the replay library. Credentials passed to the
+    director are not recorded.
+    """
+
+    def __init__(self):
+        super(Plumlib, self).__init__()
+        self.log = call_log.CallLog(call_log.log_path())
+        LOG.info(_LI('Recording director calls to %s'), self.log.path)
+
+    def _call(self, method, *args, **kwargs):
+        started = time.time()
+        recorded_args, recorded_kwargs = call_log.redact(
+            getattr(plumlib.Plumlib, method, None), args, kwargs)
+        try:
+            result = super(Plumlib, self)._call(method, *args, **kwargs)
+        except Exception as err:
+            self.log.append(method, recorded_args, recorded_kwargs,
+                            time.time() - started, error=err)
+            raise
+        self.log.append(method, recorded_args, recorded_kwargs,
+                        time.time() - started, result=result)
+        return result
@@ -0,0 +1,88 @@
+# Copyright 2016 PLUMgrid, Inc. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import threading
+import time
+
+from neutron.i18n import _LI
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from networking_plumgrid.neutron.plugins.common import exceptions as p_exc
+from networking_plumgrid.neutron.plugins.drivers import call_log
+
+LOG = logging.getLogger(__name__)
+
+# Errors replayed as themselves, other recorded errors came from the
+# PLUMgrid Library and are replayed as PLUMgridException
+REPLAYED_ERRORS = dict((exc.__name__, exc) for exc in (
+    p_exc.PLUMgridConnectionFailed, p_exc.PLUMgridCallTimeout,
+    p_exc.PLUMgridDirectorUnavailable))
+
+
+class Plumlib(object):
+    """Class PLUMgrid Replay Library.
+
+    This library replays the director calls recorded to director_call_log
+    by the recording library, without a PLUMgrid Director nor the PLUMgrid
+    Library. Every call takes the latency and returns the result, or
+    raises the error, of the next recorded call of the same method. The
+    calls of a method start over once all its recorded calls are replayed,
+    methods never recorded return right away.
+    """
+
+    def __init__(self):
+        LOG.info(_LI('Python PLUMgrid Replay Library Started '))
+        self._mutex = threading.Lock()
+        self._records = collections.defaultdict(list)
+        self._next = collections.defaultdict(int)
+
+    def director_conn(self, director_plumgrid, director_port, timeout,
+                      director_admin, director_password):
+        path = call_log.log_path()
+        for record in call_log.CallLog(path).records():
+            self._records[record['method']].append(record)
+        LOG.info(_LI('Replaying %(calls)d director calls from %(path)s'),
+                 {'calls': sum(len(r) for r in self._records.values()),
+                  'path': path})
+
+    def _replay(self, method):
+        with self._mutex:
+            records = self._records.get(method)
+            if not records:
+                return None
+            record = records[self._next[method] % len(records)]
+            self._next[method] += 1
+        delay = (record['latency'] *
+                 cfg.CONF.plumgriddirector.director_replay_scale)
+        if delay > 0:
+            time.sleep(delay)
+        if record.get('error'):
+            name, message = record['error']
+            raise REPLAYED_ERRORS.get(name, p_exc.PLUMgridException)(
+                err_msg=message)
+        return record['result']
+
+    def get_available_interface(self):
+        # Recorded under the name of the PLUMgrid Library call
+        return self._replay("get_phyattpoint_available_interface")
+
+    def __getattr__(self, method):
+        if method.startswith('_'):
+            raise AttributeError(method)
+
+        def call(*args, **kwargs):
+            return self._replay(method)
+        return call
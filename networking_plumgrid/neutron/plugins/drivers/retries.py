@@ -0,0 +1,179 @@
+# Copyright 2016 PLUMgrid, Inc. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Idempotency keys and retries of the calls made to the PLUMgrid Director
+"""
+
+import hashlib
+import sys
+import threading
+import time
+
+from neutron.i18n import _LW
+from oslo_config import cfg
+from oslo_log import log as logging
+from oslo_serialization import jsonutils
+import six
+
+from networking_plumgrid.neutron.plugins.drivers import breaker
+from networking_plumgrid.neutron.plugins.drivers import call_log
+from networking_plumgrid.neutron.plugins.drivers import director_pool
+
+LOG = logging.getLogger(__name__)
+
+retry_opts = [
+    cfg.IntOpt('director_call_retries', default=0,
+               help=_("Number of times a director call is retried when no "
+                      "PLUMgrid Director could be connected to, before the "
+                      "operation fails. Calls failing once sent are never "
+                      "retried. Retries wait with the locks of the "
+                      "operation held. 0 disables retries")),
+    cfg.FloatOpt('director_retry_interval', default=0.5,
+                 help=_("Seconds before the first retry of a director call, "
+                        "doubled for each further retry")),
+    cfg.StrOpt('director_unconfirmed_log',
+               help=_("File the idempotency keys of director calls which "
+                      "failed once sent are appended to, one JSON record "
+                      "per line, for reconciliation with the director. A "
+                      "key is confirmed once the same call succeeds"))]
+
+cfg.CONF.register_opts(retry_opts, "plumgriddirector")
+
+
+def _resource_id(args):
+    for arg in args:
+        if isinstance(arg, dict):
+            resource_id = arg.get("id")
+        else:
+            resource_id = getattr(arg, "id", None)
+        if resource_id is not None:
+            return resource_id
+    for arg in args:
+        if isinstance(arg, six.string_types):
+            return arg
+    return None
+
+
+def idempotency_key(method, args, kwargs):
+    """Return the idempotency key of a director call.
+
+    The key is the operation, the id of the resource it applies to and a
+    digest of the call arguments standing for the revision of the resource
+    sent. The same call made again gets the same key.
+    """
+    try:
+        payload = jsonutils.dumps([args, kwargs], default=call_log.primitive,
+                                  sort_keys=True)
+    except (TypeError, ValueError):
+        payload = repr([args, sorted(kwargs.items())])
+    if isinstance(payload, six.text_type):
+        payload = payload.encode('utf-8')
+    return "%s:%s:%s" % (method, _resource_id(args),
+                         hashlib.sha1(payload).hexdigest()[:12])
+
+
+class UnconfirmedCalls(object):
+    """Director calls which may or may not have been applied.
+
+    A call failing once sent is recorded with its idempotency key, the
+    resource it applies to may differ between neutron and the director.
+    The key is confirmed when the same call, e.g. the operation retried
+    by the user, succeeds later. Records are appended to
+    director_unconfirmed_log when it is set.
+    """
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._keys = set()
+        self._log = None
+
+    def _write(self, record):
+        path = cfg.CONF.plumgriddirector.director_unconfirmed_log
+        if not path:
+            return
+        with self._mutex:
+            if self._log is None or self._log.path != path:
+                self._log = call_log.CallLog(path)
+            log = self._log
+        record['time'] = round(time.time(), 3)
+        log.write(record)
+
+    def failed(self, key, method, args, error):
+        with self._mutex:
+            self._keys.add(key)
+        self._write({'key': key, 'method': method,
+                     'resource': _resource_id(args),
+                     'error': [type(error).__name__, six.text_type(error)]})
+
+    def succeeded(self, method, args, kwargs):
+        if not self._keys:
+            # No key is computed while no call is in doubt
+            return
+        key = idempotency_key(method, args, kwargs)
+        with self._mutex:
+            if key not in self._keys:
+                return
+            self._keys.discard(key)
+        self._write({'key': key, 'confirmed': True})
+
+    def keys(self):
+        with self._mutex:
+            return set(self._keys)
+
+
+unconfirmed = UnconfirmedCalls()
+
+
+def call(fn, method, args, kwargs):
+    """Call fn, the director call method, retrying it when it fails.
+
+    Only failures where the call provably never reached the director, no
+    director could be connected to, are retried. A call failing once sent,
+    e.g. on a timeout, may have been applied by the director and is not
+    sent again: the director library takes no idempotency key, so it
+    could apply the call twice. Such calls are recorded by their key as
+    unconfirmed, for reconciliation.
+    """
+    conf = cfg.CONF.plumgriddirector
+    key = None
+    attempt = 0
+    while True:
+        try:
+            result = fn()
+            unconfirmed.succeeded(method, args, kwargs)
+            return result
+        except Exception as err:
+            exc_info = sys.exc_info()
+            if (director_pool.not_sent(err) and
+                    attempt < conf.director_call_retries):
+                if key is None:
+                    key = idempotency_key(method, args, kwargs)
+                delay = conf.director_retry_interval * 2 ** attempt
+                attempt += 1
+                LOG.warning(_LW("Director call %(key)s not sent: %(err)s, "
+                                "retry %(attempt)d of %(retries)d in "
+                                "%(delay).1fs"),
+                            {'key': key, 'err': err, 'attempt': attempt,
+                             'retries': conf.director_call_retries,
+                             'delay': delay})
+                time.sleep(delay)
+                continue
+            if (isinstance(err, breaker.OUTAGE_ERRORS) and
+                    not director_pool.not_sent(err)):
+                key = key or idempotency_key(method, args, kwargs)
+                LOG.warning(_LW("Director call %s failed once sent, the "
+                                "director may have applied it"), key)
+                unconfirmed.failed(key, method, args, err)
+            six.reraise(*exc_info)
@@ -0,0 +1,145 @@
+# Copyright 2015 PLUMgrid, Inc. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Budget watchdog for the calls made to the PLUMgrid Director
+"""
+
+import contextlib
+import os
+import threading
+import time
+
+import eventlet
+from neutron.i18n import _LW
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from networking_plumgrid.neutron.plugins.common import exceptions as p_exc
+from networking_plumgrid.neutron.plugins.common.locking import lock as pg_lock
+
+LOG = logging.getLogger(__name__)
+
+watchdog_opts = [
+    cfg.FloatOpt('director_call_budget', default=10,
+                 help=_("Number of seconds a call to the PLUMgrid Director "
+                        "may take before it is reported, together with the "
+                        "PLUMgrid locks it keeps held. 0 disables the "
+                        "watchdog")),
+    cfg.DictOpt('director_call_budgets', default={},
+                help=_("Budgets of individual director calls overriding "
+                       "director_call_budget, as method:seconds pairs, "
+                       "e.g. create_port:2,delete_router:30")),
+    cfg.BoolOpt('director_call_abort', default=False,
+                help=_("Abort director calls running over their budget, "
+                       "failing the operation and releasing its locks"))]
+
+cfg.CONF.register_opts(watchdog_opts, "plumgriddirector")
+
+
+class _Call(object):
+
+    def __init__(self, method, budget):
+        self.method = method
+        self.budget = budget
+        self.started = time.time()
+        self.reported = False
+        # Locks kept held by the operation while waiting for the director
+        self.locks = ["%s (%s)" % (lock.uuid, lock.name)
+                      for lock in pg_lock.held_locks()]
+
+    def report(self, elapsed, state):
+        LOG.warning(_LW("Director call %(method)s %(state)s after "
+                        "%(elapsed).1fs, over its budget of %(budget)ss, "
+                        "holding locks on %(locks)s"),
+                    {'method': self.method, 'state': state,
+                     'elapsed': elapsed, 'budget': self.budget,
+                     'locks': ", ".join(self.locks) or "nothing"})
+
+
+class CallWatchdog(object):
+    """Report director calls running over their budget.
+
+    A single thread checks the calls in flight every second and logs those
+    over budget while they still run, the calls log their final duration
+    when they complete. With director_call_abort, calls are interrupted
+    once over budget.
+    """
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._calls = set()
+        self._pid = None
+
+    def budget(self, method):
+        conf = cfg.CONF.plumgriddirector
+        try:
+            return float(conf.director_call_budgets.get(
+                method, conf.director_call_budget))
+        except ValueError:
+            return conf.director_call_budget
+
+    def _start(self):
+        with self._mutex:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            thread = threading.Thread(target=self._run)
+            thread.daemon = True
+            thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(1)
+            now = time.time()
+            with self._mutex:
+                late = [call for call in self._calls
+                        if not call.reported and
+                        now - call.started > call.budget]
+                for call in late:
+                    call.reported = True
+            for call in late:
+                call.report(now - call.started, "still running")
+
+    @contextlib.contextmanager
+    def watch(self, method):
+        budget = self.budget(method)
+        if budget <= 0:
+            yield
+            return
+        self._start()
+        call = _Call(method, budget)
+        with self._mutex:
+            self._calls.add(call)
+        state = "completed"
+        try:
+            if cfg.CONF.plumgriddirector.director_call_abort:
+                with eventlet.Timeout(budget, p_exc.PLUMgridCallTimeout(
+                        err_msg="director call %s aborted after %ss" %
+                        (method, budget))):
+                    yield
+            else:
+                yield
+        except Exception:
+            state = "failed"
+            raise
+        finally:
+            with self._mutex:
+                self._calls.discard(call)
+            elapsed = time.time() - call.started
+            if elapsed > budget:
+                call.report(elapsed, state)
+
+
+watchdog = CallWatchdog()
@@ -16,20 +16,26 @@
 Neutron Plug-in for PLUMgrid Open Networking Suite
 """
 
+import contextlib
+import inspect
+import threading
+
 import netaddr
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import importutils
+from oslo_utils import uuidutils
 from six import string_types
 from sqlalchemy.orm import exc as sa_exc
 
 import networking_plumgrid
 from networking_plumgrid.neutron.plugins.common import constants as \
     net_pg_const
+from networking_plumgrid.neutron.plugins.common import delta as pg_delta
 from networking_plumgrid.neutron.plugins.common.locking import lock as pg_lock
+from networking_plumgrid.neutron.plugins.common.locking import lock_object
 from networking_plumgrid.neutron.plugins.db.physical_attachment_point import \
     physical_attachment_point_db as pap_db
-from networking_plumgrid.neutron.plugins.db.sqlal import api as db_api
 from networking_plumgrid.neutron.plugins.db.transitdomain import \
     transitdomain as tvd_db
 from networking_plumgrid.neutron.plugins.extensions import \
@@ -40,6 +46,7 @@ from networking_plumgrid.neutron.plugins.common import exceptions as plum_excep
 from networking_plumgrid.neutron.plugins.db.l2gateway import (l2gateway_db
     as l2gw_db)
 from networking_plumgrid.neutron.plugins.db import pgdb
+from networking_plumgrid.neutron.plugins.drivers import async_plumlib
 from networking_plumgrid.neutron.plugins.extensions import portbindings\
     as p_portbindings
 from networking_plumgrid.neutron.plugins import plugin_ver
@@ -47,7 +54,6 @@ from neutron.api import extensions as n_ext
 from neutron.api.v2 import attributes
 from neutron.common import constants
 from neutron.common import exceptions as n_exc
-from neutron.common import utils
 from neutron.db import agents_db
 from neutron.db import db_base_plugin_v2
 from neutron.db import external_net_db
@@ -96,24 +102,52 @@ cfg.CONF.register_opts(l2_gateway_opts, "l2gateway")
 ds_lock = cfg.CONF.plumgriddirector.distributed_locking
 
 
+def _locked(fn, args, kwargs, uuid, parent=None):
+    lock = pg_lock.PGLock(args[1], uuid, ds_lock, parent=parent,
+                          name=fn.__name__)
+    with lock.thread_lock(uuid):
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            lock.release(uuid)
+
+
 def pgl(fn):
     """ pg_lock decorator"""
 
     @wraps(fn)
     def locker(*args, **kwargs):
-        if ds_lock:
-            if args[-1] is not None:
-                lock = pg_lock.PGLock(args[1], args[-1], ds_lock)
-                with lock.thread_lock(args[-1]):
-                    try:
-                        return fn(*args, **kwargs)
-                    finally:
-                        lock.release(args[-1])
-        else:
-            return fn(*args, **kwargs)
+        if ds_lock and args[-1] is not None:
+            return _locked(fn, args, kwargs, args[-1])
+        return fn(*args, **kwargs)
     return locker
 
 
+def pgl_resource(arg=None, key=None):
+    """pg_lock decorator for a single resource of a tenant
+
+    Locks the resource id found in argument arg (or in its key item)
+    underneath the tenant passed as last argument, so that operations on
+    other resources of the tenant are not blocked. Without arg a new
+    resource is being created and only tenant-wide locks are excluded.
+    """
+
+    def decorator(fn):
+        @wraps(fn)
+        def locker(*args, **kwargs):
+            if not ds_lock or args[-1] is None:
+                return fn(*args, **kwargs)
+            if arg is None:
+                uuid = uuidutils.generate_uuid()
+            else:
+                uuid = inspect.getcallargs(fn, *args, **kwargs)[arg]
+                if key is not None:
+                    uuid = uuid[key]
+            return _locked(fn, args, kwargs, uuid, parent=args[-1])
+        return locker
+    return decorator
+
+
 class NeutronPluginPLUMgridV2(agents_db.AgentDbMixin,
                               db_base_plugin_v2.NeutronDbPluginV2,
                               external_net_db.External_net_db_mixin,
@@ -143,7 +177,9 @@ class NeutronPluginPLUMgridV2(agents_db.AgentDbMixin,
                       networking_plumgrid.neutron.plugins.extensions.__path__)
         super(NeutronPluginPLUMgridV2, self).__init__()
         self.plumgrid_init()
-        db_api.create_table_pg_lock()
+        self._plumlib_async = async_plumlib.AsyncPlumlib(self._plumlib)
+        self._director_calls = threading.local()
+        lock_object.PGLock.setup()
 
         LOG.debug('networking-plumgrid: Neutron server with '
                   'PLUMgrid Plugin has started')
@@ -166,6 +202,37 @@ class NeutronPluginPLUMgridV2(agents_db.AgentDbMixin,
         self._plumlib.director_conn(director_plumgrid, director_port, timeout,
                                     director_admin, director_password)
 
+    @contextlib.contextmanager
+    def _concurrent_director_calls(self):
+        """Overlap the director calls of the operations run in the block.
+
+        The calls made through _director() in the block are issued without
+        waiting for each other, and joined when the block ends.
+        """
+        outer = getattr(self._director_calls, 'group', None)
+        group = self._plumlib_async.group()
+        self._director_calls.group = group
+        try:
+            yield group
+        except Exception:
+            group.wait()
+            raise
+        finally:
+            self._director_calls.group = outer
+        try:
+            group.join()
+        except plum_excep.PLUMgridException:
+            raise
+        except Exception as err_message:
+            raise plum_excep.PLUMgridException(err_msg=err_message)
+
+    def _director(self, method, *args, **kwargs):
+        """Call the director, or join the current group of director calls"""
+        group = getattr(self._director_calls, 'group', None)
+        if group is None:
+            return getattr(self._plumlib, method)(*args, **kwargs)
+        getattr(group, method)(*args, **kwargs)
+
     def create_network(self, context, network):
         """Create Neutron network
         """
@@ -186,7 +253,7 @@ class NeutronPluginPLUMgridV2(agents_db.AgentDbMixin,
                                        physical_network, segmentation_id,
                                        tenant_id)
 
-    @pgl
+    @pgl_resource()
     def _create_network_pg(self, context, network, network_type,
                            physical_network, segmentation_id, tenant_id):
         transit_domain_id = None
@@ -268,26 +335,29 @@ class NeutronPluginPLUMgridV2(agents_db.AgentDbMixin,
         net_db = super(NeutronPluginPLUMgridV2,
                        self).get_network(context, net_id)
         tenant_id = net_db["tenant_id"]
-        return self._update_network_pg(context, net_id, network, net_db,
-                                       tenant_id)
+        return self._update_network_pg(context, net_id, network, tenant_id)
 
-    @pgl
-    def _update_network_pg(self, context, net_id, network, orig_net_db,
-                           tenant_id):
+    @pgl_resource('net_id')
+    def _update_network_pg(self, context, net_id, network, tenant_id):
         with context.session.begin(subtransactions=True):
+            # Read under the lock, the director is given the changes of
+            # this update only
+            orig_net_db = super(NeutronPluginPLUMgridV2,
+                                self).get_network(context, net_id)
             # Plugin DB - Network Update
             net_db = super(
                 NeutronPluginPLUMgridV2, self).update_network(context,
                                                               net_id, network)
             self._process_l3_update(context, net_db, network['network'])
 
-            try:
-                LOG.debug("PLUMgrid Library: update_network() called")
-                self._plumlib.update_network(tenant_id, net_id, network,
-                                             orig_net_db)
+            if self._director_delta("network", orig_net_db, net_db):
+                try:
+                    LOG.debug("PLUMgrid Library: update_network() called")
+                    self._plumlib.update_network(tenant_id, net_id, network,
+                                                 orig_net_db)
 
-            except Exception as err_message:
-                raise plum_excep.PLUMgridException(err_msg=err_message)
+                except Exception as err_message:
+                    raise plum_excep.PLUMgridException(err_msg=err_message)
 
         # Return updated network
         return net_db
@@ -320,8 +390,9 @@ class NeutronPluginPLUMgridV2(agents_db.AgentDbMixin,
             # Plugin DB - Network Delete
             super(NeutronPluginPLUMgridV2, self).delete_network(context,
                                                                 net_id)
-            lock = pg_lock.PGLock(context, tenant_id, ds_lock)
-            with lock.thread_lock(tenant_id):
+            lock = pg_lock.PGLock(context, net_id, ds_lock, parent=tenant_id,
+                                  name="_delete_network_pg")
+            with lock.thread_lock(net_id):
                 try:
                     LOG.debug("PLUMgrid Library: delete_network() called")
                     self._plumlib.delete_network(net_db, net_id)
@@ -329,9 +400,8 @@ class NeutronPluginPLUMgridV2(agents_db.AgentDbMixin,
                 except Exception as err_message:
                     raise plum_excep.PLUMgridException(err_msg=err_message)
                 finally:
-                    lock.release(tenant_id)
+                    lock.release(net_id)
 
-    @utils.synchronized('net-pg', external=True)
     def create_port(self, context, port):
         """Create Neutron port.
 
@@ -347,16 +417,14 @@ class NeutronPluginPLUMgridV2(agents_db.AgentDbMixin,
         port["port"]["admin_state_up"] = True
         port_data = port["port"]
         tenant_id = port_data["tenant_id"]
-        self._ensure_default_security_group_on_port(context, port)
-        return self._create_port_pg(context, port, port_data, tenant_id)
+        with pg_lock.striped_lock('net-pg', port_data["network_id"]):
+            self._ensure_default_security_group_on_port(context, port)
+            return self._create_port_pg(context, port, port_data, tenant_id)
 
     def _create_port_pg(self, context, port, port_data, tenant_id):
-        if ("device_owner" in port_data and
-            port_data["device_owner"] == constants.DEVICE_OWNER_ROUTER_GW):
-            lo = pg_lock.GL
-        else:
-            lo = tenant_id
-        lock = pg_lock.PGLock(context, lo, ds_lock)
+        lo, parent = self._port_lock_key(port_data, tenant_id)
+        lock = pg_lock.PGLock(context, lo, ds_lock, parent=parent,
+                              name="_create_port_pg")
         with lock.thread_lock(lo):
             try:
                 with context.session.begin(subtransactions=True):
@@ -395,7 +463,6 @@ class NeutronPluginPLUMgridV2(agents_db.AgentDbMixin,
             finally:
                 lock.release(lo)
 
-    @utils.synchronized('net-pg', external=True)
     def update_port(self, context, port_id, port):
         """Update Neutron port.
 
@@ -406,19 +473,19 @@ class NeutronPluginPLUMgridV2(agents_db.AgentDbMixin,
         port_get = super(NeutronPluginPLUMgridV2,
                          self).get_port(context, port_id)
         tenant_id = port_get["tenant_id"]
-        return self._update_port_pg(context, port_id, port, port_get,
-                                    tenant_id)
+        with pg_lock.striped_lock('net-pg', port_get["network_id"]):
+            return self._update_port_pg(context, port_id, port, port_get,
+                                        tenant_id)
 
     def _update_port_pg(self, context, port_id, port, port_get, tenant_id):
-        if ("device_owner" in port_get and
-            port_get["device_owner"] == constants.DEVICE_OWNER_ROUTER_GW):
-            lo = pg_lock.GL
-        else:
-            lo = tenant_id
-        lock = pg_lock.PGLock(context, lo, ds_lock)
+        lo, parent = self._port_lock_key(port_get, tenant_id)
+        lock = pg_lock.PGLock(context, lo, ds_lock, parent=parent,
+                              name="_update_port_pg")
         with lock.thread_lock(lo):
             try:
                 with context.session.begin(subtransactions=True):
+                    orig_port = super(NeutronPluginPLUMgridV2,
+                                      self).get_port(context, port_id)
                     # Plugin DB - Port Create and Return port
                     port_db = super(NeutronPluginPLUMgridV2, self).update_port(
                         context, port_id, port)
@@ -443,19 +510,20 @@ class NeutronPluginPLUMgridV2(agents_db.AgentDbMixin,
                                                                  port['port'],
                                                                  port_db)
 
-                    try:
-                        LOG.debug("PLUMgrid Library: create_port() called")
-                        self._plumlib.update_port(port_db, router_db)
+                    if self._director_delta("port", orig_port, port_db):
+                        try:
+                            LOG.debug("PLUMgrid Library: update_port() "
+                                      "called")
+                            self._plumlib.update_port(port_db, router_db)
 
-                    except Exception as err:
-                        raise plum_excep.PLUMgridException(err_msg=err)
+                        except Exception as err:
+                            raise plum_excep.PLUMgridException(err_msg=err)
 
                 # Plugin DB - Port Update
                 return self._port_viftype_binding(context, port_db)
             finally:
                 lock.release(lo)
 
-    @utils.synchronized('net-pg', external=True)
     def delete_port(self, context, port_id, l3_port_check=True):
         """Delete Neutron port.
 
@@ -468,17 +536,15 @@ class NeutronPluginPLUMgridV2(agents_db.AgentDbMixin,
         port_db = super(NeutronPluginPLUMgridV2,
                         self).get_port(context, port_id)
         tenant_id = port_db["tenant_id"]
-        self._delete_port_pg(context, port_id, port_db, l3_port_check,
-                             tenant_id)
+        with pg_lock.striped_lock('net-pg', port_db["network_id"]):
+            self._delete_port_pg(context, port_id, port_db, l3_port_check,
+                                 tenant_id)
 
     def _delete_port_pg(self, context, port_id, port_db, l3_port_check,
                         tenant_id):
-        if ("device_owner" in port_db and
-            port_db["device_owner"] == constants.DEVICE_OWNER_ROUTER_GW):
-            lo = pg_lock.GL
-        else:
-            lo = tenant_id
-        lock = pg_lock.PGLock(context, lo, ds_lock)
+        lo, parent = self._port_lock_key(port_db, tenant_id)
+        lock = pg_lock.PGLock(context, lo, ds_lock, parent=parent,
+                              name="_delete_port_pg")
         with lock.thread_lock(lo):
             try:
                 with context.session.begin(subtransactions=True):
@@ -495,7 +561,12 @@ class NeutronPluginPLUMgridV2(agents_db.AgentDbMixin,
                         router_db = None
                     try:
                         LOG.debug("PLUMgrid Library: delete_port() called")
-                        self._plumlib.delete_port(port_db, router_db)
+                        if router_db is None:
+                            self._director("delete_port", port_db, None)
+                        else:
+                            # The router is bound to the DB session, which
+                            # must not reach the concurrent callers
+                            self._plumlib.delete_port(port_db, router_db)
 
                     except Exception as err:
                         raise plum_excep.PLUMgridException(err_msg=err)
@@ -505,6 +576,27 @@ class NeutronPluginPLUMgridV2(agents_db.AgentDbMixin,
             finally:
                 lock.release(lo)
 
+    def _port_lock_key(self, port, tenant_id):
+        """Resource locked by operations on a port, with its parent"""
+        if port.get("device_owner") == constants.DEVICE_OWNER_ROUTER_GW:
+            # Router gateways are locked per external network
+            return port["network_id"], pg_lock.GL
+        return port["network_id"], tenant_id
+
+    def _director_delta(self, resource, orig, new):
+        """Changes of an update to send to the director, None if none"""
+        delta = pg_delta.director_delta(orig, new)
+        if not delta:
+            LOG.debug("networking-plumgrid: %(resource)s %(id)s update "
+                      "without director changes, not sent",
+                      {'resource': resource, 'id': new.get("id")})
+            return None
+        LOG.debug("networking-plumgrid: %(resource)s %(id)s update "
+                  "changes %(fields)s",
+                  {'resource': resource, 'id': new.get("id"),
+                   'fields': ", ".join(sorted(delta))})
+        return delta
+
     def get_port(self, context, id, fields=None):
         with context.session.begin(subtransactions=True):
             port_db = super(NeutronPluginPLUMgridV2,
@@ -534,7 +626,7 @@ class NeutronPluginPLUMgridV2(agents_db.AgentDbMixin,
         tenant_id = net_db["tenant_id"]
         return self._create_subnet_pg(context, subnet, net_db, tenant_id)
 
-    @pgl
+    @pgl_resource('net_db', 'id')
     def _create_subnet_pg(self, context, subnet, net_db, tenant_id):
         with context.session.begin(subtransactions=True):
             # Plugin DB - Subnet Create
@@ -603,7 +695,7 @@ class NeutronPluginPLUMgridV2(agents_db.AgentDbMixin,
         self._delete_subnet_pg(context, subnet_id, net_db, net_id, sub_db,
                                tenant_id)
 
-    @pgl
+    @pgl_resource('net_id')
     def _delete_subnet_pg(self, context, subnet_id, net_db, net_id, sub_db,
                           tenant_id):
 
@@ -629,22 +721,25 @@ class NeutronPluginPLUMgridV2(agents_db.AgentDbMixin,
         return self._update_subnet_pg(context, subnet_id, subnet, orig_sub_db,
                                       net_db, tenant_id)
 
-    @pgl
+    @pgl_resource('net_db', 'id')
     def _update_subnet_pg(self, context, subnet_id, subnet, orig_sub_db,
                           net_db, tenant_id):
         with context.session.begin(subtransactions=True):
+            # The subnet DB object is updated in place, keep its fields
+            orig_subnet = self._make_subnet_dict(orig_sub_db)
             # Plugin DB - Subnet Update
             new_sub_db = super(NeutronPluginPLUMgridV2,
                                self).update_subnet(context, subnet_id, subnet)
             ipnet = netaddr.IPNetwork(new_sub_db['cidr'])
 
-            try:
-                LOG.debug("PLUMgrid Library: update_subnet() called")
-                self._plumlib.update_subnet(orig_sub_db, new_sub_db, ipnet,
-                                            net_db)
+            if self._director_delta("subnet", orig_subnet, new_sub_db):
+                try:
+                    LOG.debug("PLUMgrid Library: update_subnet() called")
+                    self._plumlib.update_subnet(orig_sub_db, new_sub_db,
+                                                ipnet, net_db)
 
-            except Exception as err_message:
-                raise plum_excep.PLUMgridException(err_msg=err_message)
+                except Exception as err_message:
+                    raise plum_excep.PLUMgridException(err_msg=err_message)
 
         return new_sub_db
 
@@ -654,7 +749,7 @@ class NeutronPluginPLUMgridV2(agents_db.AgentDbMixin,
         tenant_id = self._get_tenant_id_for_create(context, router["router"])
         return self._create_router_pg(context, router, tenant_id)
 
-    @pgl
+    @pgl_resource()
     def _create_router_pg(self, context, router, tenant_id):
 
         with context.session.begin(subtransactions=True):
@@ -680,16 +775,19 @@ class NeutronPluginPLUMgridV2(agents_db.AgentDbMixin,
         tenant_id = orig_router["tenant_id"]
         return self._update_router_pg(context, router_id, router, tenant_id)
 
-    @pgl
+    @pgl_resource('router_id')
     def _update_router_pg(self, context, router_id, router, tenant_id):
         with context.session.begin(subtransactions=True):
+            orig_router = super(NeutronPluginPLUMgridV2,
+                                self).get_router(context, router_id)
             router_db = super(NeutronPluginPLUMgridV2,
                               self).update_router(context, router_id, router)
-            try:
-                LOG.debug("PLUMgrid Library: update_router() called")
-                self._plumlib.update_router(router_db, router_id)
-            except Exception as err_message:
-                raise plum_excep.PLUMgridException(err_msg=err_message)
+            if self._director_delta("router", orig_router, router_db):
+                try:
+                    LOG.debug("PLUMgrid Library: update_router() called")
+                    self._plumlib.update_router(router_db, router_id)
+                except Exception as err_message:
+                    raise plum_excep.PLUMgridException(err_msg=err_message)
 
         # Return updated router
         return router_db
@@ -701,15 +799,23 @@ class NeutronPluginPLUMgridV2(agents_db.AgentDbMixin,
         tenant_id = orig_router["tenant_id"]
         self._delete_router_pg(context, router_id, tenant_id)
 
-    @pgl
+    @pgl_resource('router_id')
     def _delete_router_pg(self, context, router_id, tenant_id):
         with context.session.begin(subtransactions=True):
             router = self._ensure_router_not_in_use(context, router_id)
             router_ports = router.attached_ports.all()
             # Set the router's gw_port to None to avoid a constraint violation.
             router.gw_port = None
-            for rp in router_ports:
-                self.delete_port(context.elevated(), rp.port.id)
+            # Lock all the port networks at once, the port deletions
+            # below then run under these locks
+            locks = pg_lock.PGLockSet(context, [
+                self._port_lock_key(rp.port, rp.port["tenant_id"])
+                for rp in router_ports], ds_lock, name="_delete_router_pg")
+            # The router ports are independent on the director, their
+            # deletions are sent concurrently and joined before the router
+            with locks.hold(), self._concurrent_director_calls():
+                for rp in router_ports:
+                    self.delete_port(context.elevated(), rp.port.id)
             super(NeutronPluginPLUMgridV2, self).delete_router(context,
                                                                router_id)
 
@@ -738,10 +844,13 @@ class NeutronPluginPLUMgridV2(agents_db.AgentDbMixin,
                                self).add_router_interface(context,
                                                           router_id,
                                                           interface_info)
-            lock = pg_lock.PGLock(context, tenant_id, ds_lock)
-            with lock.thread_lock(tenant_id):
+            port_db = self._get_port(context, int_router['port_id'])
+            # The interface changes the router and its network
+            locks = pg_lock.PGLockSet(context, [
+                (router_id, tenant_id), (port_db['network_id'], tenant_id)],
+                ds_lock, name="_update_router_interface_pg")
+            with locks.hold():
                 try:
-                    port_db = self._get_port(context, int_router['port_id'])
                     subnet_id = port_db["fixed_ips"][0]["subnet_id"]
                     subnet_db = super(NeutronPluginPLUMgridV2,
                                       self)._get_subnet(context, subnet_id)
@@ -755,9 +864,6 @@ class NeutronPluginPLUMgridV2(agents_db.AgentDbMixin,
                 except Exception as err_message:
                     raise plum_excep.PLUMgridException(err_msg=err_message)
 
-                finally:
-                    lock.release(tenant_id)
-
         return int_router
 
     def remove_router_interface(self, context, router_id, int_info):
@@ -786,8 +892,10 @@ class NeutronPluginPLUMgridV2(agents_db.AgentDbMixin,
                                    self).remove_router_interface(context,
                                                                  router_id,
                                                                  int_info)
-            lock = pg_lock.PGLock(context, tenant_id, ds_lock)
-            with lock.thread_lock(tenant_id):
+            locks = pg_lock.PGLockSet(context, [
+                (router_id, tenant_id), (net_id, tenant_id)],
+                ds_lock, name="_remove_router_interface_pg")
+            with locks.hold():
                 try:
                     LOG.debug("PLUMgrid Library: "
                               "remove_router_interface() called")
@@ -797,9 +905,6 @@ class NeutronPluginPLUMgridV2(agents_db.AgentDbMixin,
                 except Exception as err_message:
                     raise plum_excep.PLUMgridException(err_msg=err_message)
 
-                finally:
-                    lock.release(tenant_id)
-
         return del_int_router
 
     def create_floatingip(self, context, floatingip):
@@ -911,7 +1016,7 @@ class NeutronPluginPLUMgridV2(agents_db.AgentDbMixin,
         return self._create_security_group_pg(context, security_group, sg,
                                               default_sg, tenant_id)
 
-    @pgl
+    @pgl_resource()
     def _create_security_group_pg(self, context, security_group, sg,
                                   default_sg, tenant_id):
         with context.session.begin(subtransactions=True):
@@ -940,7 +1045,7 @@ class NeutronPluginPLUMgridV2(agents_db.AgentDbMixin,
         return self._update_security_group_pg(context, sg_id, security_group,
                                               tenant_id)
 
-    @pgl
+    @pgl_resource('sg_id')
     def _update_security_group_pg(self, context, sg_id, security_group,
                                   tenant_id):
         with context.session.begin(subtransactions=True):
@@ -977,7 +1082,7 @@ class NeutronPluginPLUMgridV2(agents_db.AgentDbMixin,
         tenant_id = sg["tenant_id"]
         self._delete_security_group_pg(context, sg_id, sg, tenant_id)
 
-    @pgl
+    @pgl_resource('sg_id')
     def _delete_security_group_pg(self, context, sg_id, sg, tenant_id):
         with context.session.begin(subtransactions=True):
 
@@ -1035,12 +1140,12 @@ class NeutronPluginPLUMgridV2(agents_db.AgentDbMixin,
         tenant_id = security_group["tenant_id"]
         return self._create_security_group_rule_bulk_pg(context,
                                                         security_group_rule,
-                                                        sg_rules,
+                                                        sg_rules, sg_id,
                                                         tenant_id)
 
-    @pgl
+    @pgl_resource('sg_id')
     def _create_security_group_rule_bulk_pg(self, context, security_group_rule,
-                                            sg_rules, tenant_id):
+                                            sg_rules, sg_id, tenant_id):
         with context.session.begin(subtransactions=True):
             sec_db = (super(NeutronPluginPLUMgridV2,
                             self).create_security_group_rule_bulk_native(
@@ -1072,7 +1177,7 @@ class NeutronPluginPLUMgridV2(agents_db.AgentDbMixin,
         tenant_id = sgr["tenant_id"]
         self._delete_security_group_rule_pg(context, sgr_id, sgr, tenant_id)
 
-    @pgl
+    @pgl_resource('sgr', 'security_group_id')
     def _delete_security_group_rule_pg(self, context, sgr_id, sgr, tenant_id):
 
         super(NeutronPluginPLUMgridV2,
@@ -0,0 +1,70 @@
+# Copyright 2016 PLUMgrid, Inc. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+PLUMgrid future returning driver proxy unit tests
+"""
+
+import threading
+
+from networking_plumgrid.neutron.plugins.drivers import async_plumlib
+from neutron.tests import base
+
+
+class _Driver(object):
+
+    def __init__(self, parties):
+        self.all_in = threading.Event()
+        self.mutex = threading.Lock()
+        self.parties = parties
+        self.calls = []
+
+    def delete_port(self, port_db, router_db):
+        # Only returns once all the deletions are running together
+        with self.mutex:
+            self.calls.append(port_db["id"])
+            if len(self.calls) == self.parties:
+                self.all_in.set()
+        if not self.all_in.wait(5):
+            raise RuntimeError("calls not concurrent")
+        if port_db["id"] == 2:
+            raise ValueError("bad port")
+        return port_db["id"]
+
+
+class TestAsyncPlumlib(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestAsyncPlumlib, self).setUp()
+        self.config(director_async_workers=4, group='plumgriddirector')
+        self.driver = _Driver(3)
+        self.proxy = async_plumlib.AsyncPlumlib(self.driver)
+
+    def test_calls_return_futures(self):
+        futures = [self.proxy.delete_port({"id": i}, None) for i in range(3)]
+        self.assertEqual(0, futures[0].result())
+        self.assertEqual(1, futures[1].result())
+        self.assertRaises(ValueError, futures[2].result)
+
+    def test_group_joins_all_calls(self):
+        group = self.proxy.group()
+        for i in (0, 2, 1):
+            group.delete_port({"id": i}, None)
+        self.assertRaises(ValueError, group.join)
+        self.assertTrue(all(f.done() for f in group.futures))
+        self.assertEqual(set([0, 1, 2]), set(self.driver.calls))
+
+    def test_missing_method(self):
+        self.assertRaises(AttributeError, getattr, self.proxy, 'parties')
+        self.assertRaises(AttributeError, getattr, self.proxy, 'nothing')
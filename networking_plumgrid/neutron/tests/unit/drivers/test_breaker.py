@@ -0,0 +1,92 @@
+# Copyright 2016 PLUMgrid, Inc. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+PLUMgrid director circuit breaker unit tests
+"""
+
+import socket
+
+import mock
+
+from networking_plumgrid.neutron.plugins.common import exceptions as p_exc
+from networking_plumgrid.neutron.plugins.drivers import breaker
+from neutron.tests import base
+
+
+class TestCircuitBreaker(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestCircuitBreaker, self).setUp()
+        self.config(director_breaker_threshold=3,
+                    director_breaker_reset_timeout=30,
+                    group='plumgriddirector')
+        self.time = mock.patch.object(breaker.time, 'time').start()
+        self.time.return_value = 100
+        self.breaker = breaker.CircuitBreaker()
+
+    def _call(self, error=None):
+        with self.breaker.guard('create_port'):
+            if error is not None:
+                raise error
+
+    def _fail(self, count):
+        for i in range(count):
+            self.assertRaises(socket.error, self._call, socket.error())
+
+    def test_trips_after_failures_in_a_row(self):
+        self._fail(2)
+        self._call()
+        self._fail(2)
+        self.assertEqual('closed', self.breaker.state()['state'])
+        self._fail(1)
+        self.assertEqual({'state': 'open', 'failures': 3,
+                          'opened_at': 100, 'trips': 1},
+                         self.breaker.state())
+        self.assertRaises(p_exc.PLUMgridDirectorUnavailable, self._call)
+
+    def test_director_errors_do_not_trip(self):
+        for i in range(5):
+            self.assertRaises(ValueError, self._call, ValueError())
+        self._call()
+        self.assertEqual('closed', self.breaker.state()['state'])
+
+    def test_timeouts_trip(self):
+        for i in range(3):
+            self.assertRaises(p_exc.PLUMgridCallTimeout, self._call,
+                              p_exc.PLUMgridCallTimeout(err_msg="slow"))
+        self.assertEqual('open', self.breaker.state()['state'])
+
+    def test_half_open_trial(self):
+        self._fail(3)
+        self.time.return_value = 130
+        # A single trial at a time, failing opens the breaker again
+        with self.breaker.guard('create_port'):
+            self.assertEqual('half-open', self.breaker.state()['state'])
+            self.assertRaises(p_exc.PLUMgridDirectorUnavailable, self._call)
+            self.time.return_value = 131
+        self.assertEqual('closed', self.breaker.state()['state'])
+        self._fail(3)
+        self.time.return_value = 200
+        self._fail(1)
+        self.assertEqual({'state': 'open', 'failures': 4,
+                          'opened_at': 200, 'trips': 2},
+                         self.breaker.state())
+        self.assertRaises(p_exc.PLUMgridDirectorUnavailable, self._call)
+
+    def test_disabled(self):
+        self.config(director_breaker_threshold=0, group='plumgriddirector')
+        self._fail(5)
+        self._call()
+        self.assertEqual('closed', self.breaker.state()['state'])
@@ -0,0 +1,74 @@
+# Copyright 2016 PLUMgrid, Inc. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+PLUMgrid director call statistics unit tests
+"""
+
+import mock
+
+from networking_plumgrid.neutron.plugins.drivers import call_stats
+from neutron.tests import base
+
+
+class TestCallStats(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestCallStats, self).setUp()
+        self.time = mock.patch.object(call_stats.time, 'time').start()
+        self.time.return_value = 100
+        self.stats = call_stats.CallStats()
+
+    def _call(self, method, latency, error=None):
+        with self.stats.track(method):
+            self.assertEqual(1, self.stats.snapshot(method)['in_flight'])
+            self.time.return_value += latency
+            if error is not None:
+                raise error
+
+    def test_latency_histogram(self):
+        self._call('create_port', 0.003)
+        self._call('create_port', 0.2)
+        self._call('create_port', 30)
+        self._call('create_network', 0.04)
+        stats = self.stats.snapshot('create_port')
+        self.assertEqual(3, stats['calls'])
+        self.assertEqual(0, stats['in_flight'])
+        self.assertEqual(30, stats['latency_max'])
+        self.assertAlmostEqual(30.203 / 3, stats['latency_avg'])
+        self.assertEqual([1, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 1],
+                         stats['histogram'])
+        self.assertEqual(['create_network', 'create_port'],
+                         sorted(self.stats.snapshot()))
+
+    def test_errors_by_type(self):
+        self.assertRaises(ValueError, self._call, 'create_port', 1,
+                          ValueError())
+        self.assertRaises(ValueError, self._call, 'create_port', 1,
+                          ValueError())
+        self.assertRaises(KeyError, self._call, 'create_port', 1, KeyError())
+        self._call('create_port', 1)
+        stats = self.stats.snapshot('create_port')
+        self.assertEqual(4, stats['calls'])
+        self.assertEqual({'ValueError': 2, 'KeyError': 1}, stats['errors'])
+
+    def test_reset_keeps_calls_in_flight(self):
+        self._call('create_port', 1)
+        with self.stats.track('delete_port'):
+            self.stats.reset()
+            self.assertEqual({'delete_port'}, set(self.stats.snapshot()))
+            self.stats.dump()
+        stats = self.stats.snapshot('delete_port')
+        self.assertEqual(0, stats['in_flight'])
+        self.assertEqual(1, stats['calls'])
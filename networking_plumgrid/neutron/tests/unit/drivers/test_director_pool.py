@@ -0,0 +1,150 @@
+# Copyright 2016 PLUMgrid, Inc. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+PLUMgrid Director pool unit tests
+"""
+
+import errno
+import socket
+
+import mock
+
+from networking_plumgrid.neutron.plugins.common import exceptions as p_exc
+from networking_plumgrid.neutron.plugins.drivers import director_pool
+from neutron.tests import base
+
+
+class TestDirectorPool(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestDirectorPool, self).setUp()
+        self.config(director_servers=['10.0.0.1', '10.0.0.2:8443'],
+                    director_health_interval=0, group='plumgriddirector')
+        self.connect = mock.Mock(side_effect=lambda host, port: host)
+        self.pool = director_pool.DirectorPool.from_config(
+            'localhost', 443, self.connect, 5)
+
+    def test_from_config(self):
+        self.assertEqual(['10.0.0.1:443', '10.0.0.2:8443'],
+                         [str(e) for e in self.pool.endpoints])
+
+    def test_single_director(self):
+        self.config(director_servers=[], group='plumgriddirector')
+        pool = director_pool.DirectorPool.from_config(
+            'localhost', 443, self.connect, 5)
+        self.assertEqual(['localhost:443'], [str(e) for e in pool.endpoints])
+
+    def test_call_fails_over(self):
+        fn = mock.Mock(side_effect=[
+            socket.error(errno.ECONNREFUSED, "refused"), "done"])
+        self.assertEqual("done", self.pool.call(fn))
+        self.assertEqual([mock.call('10.0.0.1'), mock.call('10.0.0.2')],
+                         fn.call_args_list)
+        first, second = self.pool.endpoints
+        self.assertFalse(first.healthy)
+        self.assertEqual(0, len(first.idle))
+        self.assertEqual([second, first], self.pool.ordered())
+
+    def test_call_fails_on_all_directors(self):
+        fn = mock.Mock(side_effect=socket.error(errno.EHOSTUNREACH,
+                                                "unreachable"))
+        self.assertRaises(p_exc.PLUMgridConnectionFailed,
+                          self.pool.call, fn)
+        self.assertEqual(2, fn.call_count)
+
+    def test_connect_failure_fails_over(self):
+        self.connect.side_effect = [IOError("login failed"), "10.0.0.2"]
+        fn = mock.Mock(return_value="done")
+        self.assertEqual("done", self.pool.call(fn))
+        fn.assert_called_once_with("10.0.0.2")
+
+    def test_sent_call_does_not_fail_over(self):
+        for error in (socket.timeout("timed out"), IOError("reset"),
+                      IOError(IOError(errno.ECONNRESET, "reset"))):
+            fn = mock.Mock(side_effect=error)
+            self.assertRaises(type(error), self.pool.call, fn)
+            self.assertEqual(1, fn.call_count)
+
+    def test_not_sent(self):
+        class NewConnectionError(Exception):
+            pass
+
+        class MaxRetryError(IOError):
+            def __init__(self, reason):
+                super(MaxRetryError, self).__init__("max retries")
+                self.reason = reason
+
+        wrapped = IOError(MaxRetryError(NewConnectionError()))
+        self.assertTrue(director_pool.not_sent(wrapped))
+        self.assertTrue(director_pool.not_sent(
+            IOError(socket.error(errno.ECONNREFUSED, "refused"))))
+        self.assertFalse(director_pool.not_sent(socket.timeout()))
+        self.assertFalse(director_pool.not_sent(ValueError("bad")))
+
+    def test_clients_are_reused(self):
+        self.config(director_pool_size=1, group='plumgriddirector')
+        self.connect.side_effect = lambda host, port: mock.Mock()
+        endpoint = self.pool.endpoints[0]
+        with self.pool.client(endpoint):
+            with self.pool.client(endpoint) as second:
+                pass
+        with self.pool.client(endpoint) as third:
+            pass
+        self.assertEqual(2, self.connect.call_count)
+        self.assertIs(second, third)
+        self.assertEqual(1, len(endpoint.idle))
+
+    def test_interrupted_clients_are_dropped(self):
+        endpoint = self.pool.endpoints[0]
+
+        def use(error):
+            with self.pool.client(endpoint):
+                raise error
+
+        self.assertRaises(ValueError, use, ValueError("director error"))
+        self.assertEqual(1, len(endpoint.idle))
+        endpoint.idle.clear()
+        for error in (p_exc.PLUMgridCallTimeout(err_msg="aborted"),
+                      socket.timeout("timed out"), KeyboardInterrupt()):
+            self.assertRaises(type(error), use, error)
+            self.assertEqual(0, len(endpoint.idle))
+
+    def test_idle_clients_expire(self):
+        self.config(director_idle_timeout=0, group='plumgriddirector')
+        endpoint = self.pool.endpoints[0]
+        endpoint.put("stale", 4)
+        with mock.patch.object(director_pool.time, 'time',
+                               return_value=endpoint.idle[0][1] + 1):
+            with self.pool.client(endpoint):
+                pass
+        self.connect.assert_called_once_with('10.0.0.1', 443)
+
+    def test_fastest_director_first(self):
+        first, second = self.pool.endpoints
+        first.latency, second.latency = 0.2, 0.1
+        self.assertEqual([second, first], self.pool.ordered())
+
+    def test_health_check(self):
+        first = self.pool.endpoints[0]
+        first.healthy = False
+        with mock.patch.object(socket, 'create_connection') as conn:
+            self.pool.check(first)
+        conn.assert_called_once_with(('10.0.0.1', 443), 5)
+        self.assertTrue(first.healthy)
+        self.assertIsNotNone(first.latency)
+        with mock.patch.object(socket, 'create_connection',
+                               side_effect=socket.error("down")):
+            self.pool.check(first)
+        self.assertFalse(first.healthy)
@@ -0,0 +1,79 @@
+# Copyright 2016 PLUMgrid, Inc. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+PLUMgrid director native thread pool unit tests
+"""
+
+import threading
+
+import mock
+
+from networking_plumgrid.neutron.plugins.drivers import native_pool
+from neutron.tests import base
+
+
+class TestNativePool(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestNativePool, self).setUp()
+        self.config(director_native_threads=True,
+                    director_native_pool_size=1, group='plumgriddirector')
+        self.execute = mock.patch.object(
+            native_pool.tpool, 'execute',
+            side_effect=lambda fn, *args, **kwargs: fn(*args, **kwargs)
+        ).start()
+        mock.patch.object(native_pool.tpool, 'set_num_threads').start()
+        self.pool = native_pool.NativePool()
+
+    def test_disabled_calls_in_line(self):
+        self.config(director_native_threads=False, group='plumgriddirector')
+        self.assertEqual(3, self.pool.execute(lambda x: x + 1, 2))
+        self.assertFalse(self.execute.called)
+        self.assertEqual(0, self.pool.snapshot()['calls'])
+
+    def test_calls_run_on_tpool(self):
+        self.assertEqual(3, self.pool.execute(lambda x: x + 1, 2))
+        self.assertRaises(ValueError, self.pool.execute, int, "x")
+        self.assertEqual(2, self.execute.call_count)
+        self.assertEqual({'queued': 0, 'running': 0, 'peak_queued': 0,
+                          'calls': 2}, self.pool.snapshot())
+
+    def test_queue_depth(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+
+        first = threading.Thread(target=self.pool.execute, args=(slow,))
+        first.start()
+        started.wait(5)
+        second = threading.Thread(target=self.pool.execute,
+                                  args=(lambda: None,))
+        second.start()
+        for i in range(500):
+            if self.pool.snapshot()['queued']:
+                break
+            release.wait(0.01)
+        self.assertEqual({'queued': 1, 'running': 1, 'peak_queued': 1,
+                          'calls': 0}, self.pool.snapshot())
+        release.set()
+        first.join()
+        second.join()
+        self.assertEqual(2, self.pool.snapshot()['calls'])
+        self.pool.reset()
+        self.assertEqual({'queued': 0, 'running': 0, 'peak_queued': 0,
+                          'calls': 0}, self.pool.snapshot())
@@ -0,0 +1,94 @@
+# Copyright 2016 PLUMgrid, Inc. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+PLUMgrid director call log and replay driver unit tests
+"""
+
+import os
+import shutil
+import tempfile
+
+import mock
+
+from networking_plumgrid.neutron.plugins.common import exceptions as p_exc
+from networking_plumgrid.neutron.plugins.drivers import call_log
+from networking_plumgrid.neutron.plugins.drivers import replay_plumlib
+from neutron.tests import base
+
+PORT = {"id": "c1a4f0a2", "tenant_id": "94eb42de4e331"}
+
+
+class TestReplayPlumlib(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestReplayPlumlib, self).setUp()
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        self.path = os.path.join(tmpdir, 'calls.log')
+        self.config(director_call_log=self.path, director_replay_scale=2,
+                    group='plumgriddirector')
+        self.sleep = mock.patch.object(replay_plumlib.time, 'sleep').start()
+        log = call_log.CallLog(self.path)
+        log.append('get_phyattpoint_available_interface', (), {}, 0.25,
+                   result=["host1", "eth1"])
+        log.append('create_port', (PORT, None), {}, 0.1)
+        log.append('create_port', (PORT, None), {}, 0.5,
+                   error=p_exc.PLUMgridConnectionFailed(err_msg="down"))
+
+    def _driver(self):
+        driver = replay_plumlib.Plumlib()
+        driver.director_conn('1.1.1.1', 8080, 5, 'admin', 'password')
+        return driver
+
+    def test_records(self):
+        records = call_log.CallLog(self.path).records()
+        self.assertEqual(3, len(records))
+        self.assertEqual({'method': 'create_port', 'args': [PORT, None],
+                          'kwargs': {}, 'latency': 0.1, 'result': None},
+                         records[1])
+        self.assertEqual('PLUMgridConnectionFailed', records[2]['error'][0])
+
+    def test_redact(self):
+        class Driver(object):
+            def create_l2_gateway(self, director_admin, director_password,
+                                  gateway_info, sw_password=None):
+                pass
+
+        self.assertEqual(
+            (("admin", call_log.REDACTED, PORT),
+             {'sw_password': call_log.REDACTED}),
+            call_log.redact(Driver.create_l2_gateway, ("admin", "pw", PORT),
+                            {'sw_password': "pw"}))
+        self.assertEqual((("pw",), {}), call_log.redact(None, ("pw",), {}))
+
+    def test_replay(self):
+        driver = self._driver()
+        hostname, ifc = driver.get_available_interface()
+        self.assertEqual(("host1", "eth1"), (hostname, ifc))
+        self.assertIsNone(driver.create_port(PORT, None))
+        self.assertRaises(p_exc.PLUMgridConnectionFailed,
+                          driver.create_port, PORT, None)
+        # Calls of a method start over once all were replayed
+        self.assertIsNone(driver.create_port(PORT, None))
+        self.assertEqual([mock.call(0.5), mock.call(0.2), mock.call(1.0),
+                          mock.call(0.2)], self.sleep.call_args_list)
+
+    def test_unrecorded_method(self):
+        self.assertIsNone(self._driver().delete_router("t", "r"))
+        self.assertFalse(self.sleep.called)
+
+    def test_log_path_required(self):
+        self.config(director_call_log=None, group='plumgriddirector')
+        self.assertRaises(p_exc.PLUMgridException, self._driver)
@@ -0,0 +1,118 @@
+# Copyright 2016 PLUMgrid, Inc. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+PLUMgrid director call retries unit tests
+"""
+
+import errno
+import os
+import shutil
+import socket
+import tempfile
+
+import mock
+
+from networking_plumgrid.neutron.plugins.common import exceptions as p_exc
+from networking_plumgrid.neutron.plugins.drivers import call_log
+from networking_plumgrid.neutron.plugins.drivers import retries
+from neutron.tests import base
+
+PORT = {"id": "c1a4f0a2", "tenant_id": "94eb42de4e331", "name": "p"}
+
+
+class TestIdempotencyKey(base.BaseTestCase):
+
+    def test_key_is_deterministic(self):
+        key = retries.idempotency_key('update_port', (PORT, None), {})
+        self.assertEqual(key, retries.idempotency_key(
+            'update_port', (dict(PORT), None), {}))
+        self.assertTrue(key.startswith('update_port:c1a4f0a2:'))
+
+    def test_key_changes_with_revision(self):
+        key = retries.idempotency_key('update_port', (PORT, None), {})
+        self.assertNotEqual(key, retries.idempotency_key(
+            'update_port', (dict(PORT, name="q"), None), {}))
+        self.assertNotEqual(key, retries.idempotency_key(
+            'create_port', (PORT, None), {}))
+
+    def test_key_of_resource_given_by_id(self):
+        key = retries.idempotency_key('delete_transit_domain',
+                                      ("5d2c1b0e",), {})
+        self.assertTrue(key.startswith('delete_transit_domain:5d2c1b0e:'))
+
+
+class TestRetries(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestRetries, self).setUp()
+        self.config(director_call_retries=2, director_retry_interval=0.5,
+                    group='plumgriddirector')
+        self.sleep = mock.patch.object(retries.time, 'sleep').start()
+        self.unconfirmed = mock.patch.object(
+            retries, 'unconfirmed', retries.UnconfirmedCalls()).start()
+        self.fn = mock.Mock()
+
+    def _call(self):
+        return retries.call(self.fn, 'create_port', (PORT, None), {})
+
+    def test_no_retry_on_success(self):
+        self.fn.return_value = 1
+        self.assertEqual(1, self._call())
+        self.assertEqual(1, self.fn.call_count)
+        self.assertFalse(self.sleep.called)
+
+    def test_unsent_failures_are_retried(self):
+        self.fn.side_effect = [
+            p_exc.PLUMgridConnectionFailed(err_msg="down"),
+            socket.error(errno.ECONNREFUSED, "refused"), 1]
+        self.assertEqual(1, self._call())
+        self.assertEqual([mock.call(0.5), mock.call(1.0)],
+                         self.sleep.call_args_list)
+
+    def test_gives_up_after_retries(self):
+        self.fn.side_effect = p_exc.PLUMgridConnectionFailed(err_msg="down")
+        self.assertRaises(p_exc.PLUMgridConnectionFailed, self._call)
+        self.assertEqual(3, self.fn.call_count)
+
+    def test_sent_failures_are_not_retried(self):
+        for error in (p_exc.PLUMgridCallTimeout(err_msg="slow"),
+                      socket.timeout("timed out"), ValueError()):
+            self.fn.reset_mock()
+            self.fn.side_effect = error
+            self.assertRaises(type(error), self._call)
+            self.assertEqual(1, self.fn.call_count)
+        self.assertFalse(self.sleep.called)
+
+    def test_retries_disabled(self):
+        self.config(director_call_retries=0, group='plumgriddirector')
+        self.fn.side_effect = p_exc.PLUMgridConnectionFailed(err_msg="down")
+        self.assertRaises(p_exc.PLUMgridConnectionFailed, self._call)
+        self.assertEqual(1, self.fn.call_count)
+
+    def test_sent_failures_are_unconfirmed_until_call_succeeds(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'unconfirmed.log')
+        self.config(director_unconfirmed_log=path, group='plumgriddirector')
+        key = retries.idempotency_key('create_port', (PORT, None), {})
+        self.fn.side_effect = [p_exc.PLUMgridCallTimeout(err_msg="slow"), 1]
+        self.assertRaises(p_exc.PLUMgridCallTimeout, self._call)
+        self.assertEqual(set([key]), self.unconfirmed.keys())
+        self.assertEqual(1, self._call())
+        self.assertEqual(set(), self.unconfirmed.keys())
+        records = call_log.CallLog(path).records()
+        self.assertEqual([key, key], [r['key'] for r in records])
+        self.assertEqual('c1a4f0a2', records[0]['resource'])
+        self.assertTrue(records[1]['confirmed'])
@@ -0,0 +1,60 @@
+# Copyright 2016 PLUMgrid, Inc. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+PLUMgrid director call watchdog unit tests
+"""
+
+import eventlet
+import mock
+
+from networking_plumgrid.neutron.plugins.common import exceptions as p_exc
+from networking_plumgrid.neutron.plugins.drivers import watchdog
+from neutron.tests import base
+
+
+class TestCallWatchdog(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestCallWatchdog, self).setUp()
+        self.config(director_call_budget=0.01,
+                    director_call_budgets={'delete_router': '30'},
+                    group='plumgriddirector')
+        self.watchdog = watchdog.CallWatchdog()
+        self.log = mock.patch.object(watchdog, 'LOG').start()
+
+    def test_budget_by_method(self):
+        self.assertEqual(30, self.watchdog.budget('delete_router'))
+        self.assertEqual(0.01, self.watchdog.budget('create_port'))
+
+    def test_call_over_budget_is_reported(self):
+        with self.watchdog.watch('create_port'):
+            eventlet.sleep(0.02)
+        self.assertEqual(1, self.log.warning.call_count)
+        self.assertEqual('create_port',
+                         self.log.warning.call_args[0][1]['method'])
+
+    def test_call_within_budget(self):
+        with self.watchdog.watch('delete_router'):
+            pass
+        self.assertFalse(self.log.warning.called)
+
+    def test_call_over_budget_is_aborted(self):
+        self.config(director_call_abort=True, group='plumgriddirector')
+
+        def call():
+            with self.watchdog.watch('create_port'):
+                eventlet.sleep(1)
+        self.assertRaises(p_exc.PLUMgridException, call)
+        self.assertEqual('failed', self.log.warning.call_args[0][1]['state'])
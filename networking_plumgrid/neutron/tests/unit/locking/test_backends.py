@@ -0,0 +1,142 @@
+# Copyright 2016 PLUMgrid, Inc. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+PLUMgrid lock backend unit tests
+"""
+
+import os
+import shutil
+import tempfile
+
+import mock
+
+from networking_plumgrid.neutron.plugins.common.locking.backends import file
+from networking_plumgrid.neutron.plugins.common.locking.backends import memory
+from networking_plumgrid.neutron.plugins.common.locking import lock_object
+from networking_plumgrid.neutron.plugins.db.sqlal import api as sqlal_api
+from neutron.tests import base
+
+TENANT_ID = "94eb42de4e331"
+NETWORK_ID = "b843d18245678"
+
+
+class TestMemoryLockBackend(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestMemoryLockBackend, self).setUp()
+        self.backend = self.get_backend()
+
+    def get_backend(self):
+        return memory.MemoryLockBackend()
+
+    def test_create_exclusive(self):
+        self.assertEqual(1, self.backend.create(TENANT_ID, "a", 30))
+        self.assertIsNone(self.backend.create(TENANT_ID, "b", 30))
+        self.assertTrue(self.backend.held(TENANT_ID, ["b"]))
+        self.assertFalse(self.backend.held(TENANT_ID, ["a"]))
+
+    def test_expired_lock_is_swept(self):
+        self.backend.create(TENANT_ID, "a", -1)
+        self.backend.create(NETWORK_ID, "a", 30)
+        self.assertIsNone(self.backend.create(TENANT_ID, "b", 30))
+        self.assertFalse(self.backend.held(TENANT_ID, ["b"]))
+        self.assertEqual(1, self.backend.sweep(30))
+        self.assertEqual(2, self.backend.create(TENANT_ID, "b", 30))
+        self.assertTrue(self.backend.release(TENANT_ID, "a"))
+        self.assertIsNone(self.backend.release(TENANT_ID, "b"))
+
+    def test_unlocked_fences_are_swept(self):
+        self.backend.create(TENANT_ID, "a", 30)
+        self.backend.create(NETWORK_ID, "a", 30)
+        self.backend.release(TENANT_ID, "a")
+        self.assertEqual(0, self.backend.sweep(-1))
+        # Tokens of swept fences start above the highest one swept
+        self.assertEqual(2, self.backend.create(TENANT_ID, "b", 30))
+        self.assertEqual(2, self.backend.create("r1", "b", 30))
+        self.backend.release(NETWORK_ID, "a")
+        self.assertEqual(2, self.backend.create(NETWORK_ID, "b", 30))
+
+    def test_owned(self):
+        token = self.backend.create(TENANT_ID, "a", 30)
+        self.assertTrue(self.backend.owned(TENANT_ID, "a", token))
+        self.assertFalse(self.backend.owned(TENANT_ID, "b", token))
+        self.assertFalse(self.backend.owned(TENANT_ID, "a", token + 1))
+        self.backend.release(TENANT_ID, "a")
+        self.assertFalse(self.backend.owned(TENANT_ID, "a", token))
+
+    def test_nested_locks(self):
+        self.backend.create(NETWORK_ID, "a", 30, parent=TENANT_ID)
+        self.backend.create("r1", "b", 30, parent=TENANT_ID)
+        self.assertEqual(2, self.backend.children(TENANT_ID, []))
+        self.assertEqual(1, self.backend.children(TENANT_ID, ["a"]))
+        self.assertEqual(0, self.backend.children(NETWORK_ID, []))
+        self.assertFalse(self.backend.held(NETWORK_ID, ["a"]))
+        self.assertTrue(self.backend.held(NETWORK_ID, ["b"]))
+
+    def test_queue(self):
+        self.assertFalse(self.backend.queued(TENANT_ID, None, 30))
+        first = self.backend.enqueue(TENANT_ID, "a", 30)
+        second = self.backend.enqueue(TENANT_ID, "b", 30)
+        self.assertTrue(self.backend.queued(TENANT_ID, None, 30))
+        self.assertFalse(self.backend.queued(TENANT_ID, first, 30))
+        self.assertTrue(self.backend.queued(TENANT_ID, second, 30))
+        self.backend.dequeue(first)
+        self.assertFalse(self.backend.queued(TENANT_ID, second, 30))
+        self.assertFalse(self.backend.queued(NETWORK_ID, None, 30))
+
+    def test_handoff_and_renew(self):
+        self.backend.create(TENANT_ID, "a", 30)
+        self.assertEqual(2, self.backend.handoff(TENANT_ID, "a", "b", 30))
+        self.assertIsNone(self.backend.handoff(TENANT_ID, "a", "c", 30))
+        self.assertEqual(set(["a"]), self.backend.renew(["a", "b"], 30))
+
+
+class TestFileLockBackend(TestMemoryLockBackend):
+
+    def get_backend(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        self.config(lock_file=os.path.join(path, "locks.json"),
+                    group='plumgriddirector')
+        return file.FileLockBackend()
+
+    def test_locks_are_shared_through_the_file(self):
+        self.backend.create(TENANT_ID, "a", 30)
+        self.assertTrue(file.FileLockBackend().held(TENANT_ID, ["b"]))
+
+
+class TestLockBackendSelection(base.BaseTestCase):
+
+    def test_backend_by_name(self):
+        self.config(lock_backend='memory', group='plumgriddirector')
+        with mock.patch.object(lock_object, '_backend', None):
+            self.assertIsInstance(lock_object.get_backend(),
+                                  memory.MemoryLockBackend)
+
+
+class TestLockEngine(base.BaseTestCase):
+
+    def test_lock_engine_has_own_pool(self):
+        self.config(lock_connection="sqlite://", lock_max_pool_size=2,
+                    group='plumgriddirector')
+        with mock.patch.object(sqlal_api, '_lock_facade', None), \
+                mock.patch.object(sqlal_api.db_session,
+                                  'EngineFacade') as facade:
+            self.assertEqual(facade.return_value,
+                             sqlal_api.get_lock_facade())
+        facade.assert_called_once_with(
+            "sqlite://", autocommit=True, expire_on_commit=False,
+            max_pool_size=2, max_overflow=10, pool_timeout=10,
+            max_retries=mock.ANY, retry_interval=mock.ANY)
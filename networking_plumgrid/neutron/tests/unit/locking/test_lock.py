@@ -0,0 +1,457 @@
+# Copyright 2016 PLUMgrid, Inc. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+PLUMgrid lock unit tests
+"""
+
+import threading
+import time
+
+import mock
+
+from networking_plumgrid.neutron.plugins.common import exceptions as p_exc
+from networking_plumgrid.neutron.plugins.common.locking import lock as pg_lock
+from networking_plumgrid.neutron.plugins.common.locking import lock_object
+from neutron.tests import base
+
+TENANT_ID = "94eb42de4e331"
+NETWORK_ID = "b843d18245678"
+
+
+class TestWaitQueue(base.BaseTestCase):
+
+    def test_notify_wakes_oldest_waiter(self):
+        queue = pg_lock.WaitQueue()
+        first = queue.register(TENANT_ID)
+        second = queue.register(TENANT_ID)
+        queue.notify(TENANT_ID)
+        self.assertTrue(first.is_set())
+        self.assertFalse(second.is_set())
+
+    def test_unconsumed_wakeup_is_passed_on(self):
+        queue = pg_lock.WaitQueue()
+        first = queue.register(TENANT_ID)
+        second = queue.register(TENANT_ID)
+        queue.notify(TENANT_ID)
+        queue.unregister(TENANT_ID, first)
+        self.assertTrue(second.is_set())
+
+    def test_notify_without_waiters(self):
+        queue = pg_lock.WaitQueue()
+        queue.notify(TENANT_ID)
+        event = queue.register(TENANT_ID)
+        self.assertFalse(event.is_set())
+
+
+class PGLockTestCase(base.BaseTestCase):
+    """Locks taken against a mocked backend, without lease or sweeper."""
+
+    def setUp(self):
+        super(PGLockTestCase, self).setUp()
+        self.config(lock_wait_timeout=1, lock_poll_interval_min=0.001,
+                    lock_poll_interval_max=0.002, group='plumgriddirector')
+        self.create = mock.patch.object(lock_object.PGLock, 'create').start()
+        self.children = mock.patch.object(lock_object.PGLock, 'children',
+                                          return_value=0).start()
+        self.leases = mock.patch.object(pg_lock, 'leases').start()
+        mock.patch.object(pg_lock, 'local', pg_lock.LocalLocks()).start()
+        mock.patch.object(pg_lock, 'sweeper').start()
+        mock.patch.object(pg_lock, '_held', threading.local()).start()
+
+
+class TestPGLockAcquire(PGLockTestCase):
+
+    def test_acquire_waits_for_release(self):
+        self.create.side_effect = [None, p_exc.TenantResourcesInUse(), 7]
+        lock = pg_lock.PGLock(None, TENANT_ID)
+        lock.acquire()
+        self.assertEqual(3, self.create.call_count)
+        self.assertEqual(7, lock.token)
+        self.leases.add.assert_called_once_with(lock)
+
+    def test_acquire_non_blocking(self):
+        self.create.return_value = None
+        lock = pg_lock.PGLock(None, TENANT_ID)
+        self.assertRaises(p_exc.TenantResourcesInUse, lock.acquire,
+                          blocking=False)
+        self.assertEqual(1, self.create.call_count)
+
+    def test_acquire_times_out(self):
+        self.config(lock_wait_timeout=0, group='plumgriddirector')
+        self.create.return_value = None
+        lock = pg_lock.PGLock(None, TENANT_ID)
+        self.assertRaises(p_exc.TenantResourcesInUse, lock.acquire)
+
+    def test_release_only_own_lock(self):
+        self.create.return_value = 3
+        lock = pg_lock.PGLock(None, TENANT_ID)
+        lock.acquire()
+        with mock.patch.object(lock_object.PGLock, 'release') as release:
+            lock.release(TENANT_ID)
+        release.assert_called_once_with(TENANT_ID, lock.owner)
+        self.leases.discard.assert_called_once_with(lock)
+        self.assertIsNone(lock.token)
+
+    def _wait_queued(self, uuid):
+        while not pg_lock.local._queues.get(uuid):
+            time.sleep(0.001)
+
+    def test_release_hands_lock_over_to_local_waiter(self):
+        self.create.return_value = 1
+        first = pg_lock.PGLock(None, TENANT_ID)
+        first.acquire()
+        second = pg_lock.PGLock(None, TENANT_ID)
+        waiter = threading.Thread(target=second.acquire)
+        waiter.start()
+        self._wait_queued(TENANT_ID)
+        with mock.patch.object(lock_object.PGLock, 'handoff',
+                               return_value=2) as handoff:
+            first.release(TENANT_ID)
+            waiter.join()
+        handoff.assert_called_once_with(TENANT_ID, first.owner,
+                                        second.owner, mock.ANY)
+        self.assertEqual(1, self.create.call_count)
+        self.assertEqual(2, second.token)
+        self.assertEqual(1, second.handoffs)
+        self.assertIsNone(first.token)
+
+    def test_release_without_handoff_wakes_local_waiter(self):
+        self.config(lock_max_handoffs=0, group='plumgriddirector')
+        self.create.return_value = 1
+        first = pg_lock.PGLock(None, TENANT_ID)
+        first.acquire()
+        second = pg_lock.PGLock(None, TENANT_ID)
+        waiter = threading.Thread(target=second.acquire)
+        waiter.start()
+        self._wait_queued(TENANT_ID)
+        with mock.patch.object(lock_object.PGLock, 'release'):
+            first.release(TENANT_ID)
+            waiter.join()
+        self.assertEqual(2, self.create.call_count)
+        self.assertEqual(0, second.handoffs)
+
+    def test_failed_handoff_wakes_local_waiter(self):
+        self.create.return_value = 1
+        first = pg_lock.PGLock(None, TENANT_ID)
+        first.acquire()
+        second = pg_lock.PGLock(None, TENANT_ID)
+        waiter = threading.Thread(target=second.acquire)
+        waiter.start()
+        self._wait_queued(TENANT_ID)
+        with mock.patch.object(lock_object.PGLock, 'handoff',
+                               side_effect=Exception), \
+                mock.patch.object(lock_object.PGLock, 'release') as release:
+            first.release(TENANT_ID)
+            waiter.join()
+        release.assert_called_once_with(TENANT_ID, first.owner)
+        self.assertEqual(2, self.create.call_count)
+        self.assertEqual(0, second.handoffs)
+
+    def test_failed_release_wakes_local_waiter(self):
+        self.config(lock_max_handoffs=0, group='plumgriddirector')
+        self.create.return_value = 1
+        first = pg_lock.PGLock(None, TENANT_ID)
+        first.acquire()
+        second = pg_lock.PGLock(None, TENANT_ID)
+        waiter = threading.Thread(target=second.acquire)
+        waiter.start()
+        self._wait_queued(TENANT_ID)
+        with mock.patch.object(lock_object.PGLock, 'release',
+                               side_effect=[Exception, None]):
+            self.assertRaises(Exception, first.release, TENANT_ID)
+            waiter.join()
+        self.assertEqual(2, self.create.call_count)
+        self.assertIsNotNone(second.token)
+
+    def test_local_waiter_gives_up_on_hung_handoff(self):
+        self.config(lock_lease_time=0, group='plumgriddirector')
+        self.create.return_value = 1
+        first = pg_lock.PGLock(None, TENANT_ID)
+        first.acquire()
+        second = pg_lock.PGLock(None, TENANT_ID)
+        failed = []
+
+        def acquire():
+            try:
+                second.acquire()
+            except p_exc.TenantResourcesInUse:
+                failed.append(second)
+
+        waiter = threading.Thread(target=acquire)
+        waiter.start()
+        self._wait_queued(TENANT_ID)
+        hung = threading.Event()
+
+        def handoff(*args):
+            hung.wait()
+            return 2
+
+        with mock.patch.object(lock_object.PGLock, 'handoff',
+                               side_effect=handoff), \
+                mock.patch.object(lock_object.PGLock, 'release') as release:
+            releaser = threading.Thread(target=first.release,
+                                        args=(TENANT_ID,))
+            releaser.start()
+            waiter.join()
+            self.assertEqual([second], failed)
+            self.assertNotIn(TENANT_ID, pg_lock.local._current)
+            hung.set()
+            releaser.join()
+        # The row handed over too late is released for the waiter
+        release.assert_called_once_with(TENANT_ID, second.owner)
+
+    def test_no_handoff_to_waiter_with_other_parent(self):
+        self.create.return_value = 1
+        mock.patch.object(lock_object.PGLock, 'held',
+                          return_value=False).start()
+        first = pg_lock.PGLock(None, NETWORK_ID, parent=pg_lock.GL)
+        first.acquire()
+        second = pg_lock.PGLock(None, NETWORK_ID, parent=TENANT_ID)
+        waiter = threading.Thread(target=second.acquire)
+        waiter.start()
+        self._wait_queued(NETWORK_ID)
+        with mock.patch.object(lock_object.PGLock, 'handoff') as handoff, \
+                mock.patch.object(lock_object.PGLock, 'release'):
+            first.release(NETWORK_ID)
+            waiter.join()
+        self.assertFalse(handoff.called)
+        self.assertEqual(2, self.create.call_count)
+        self.assertEqual(0, second.handoffs)
+
+    def test_local_waiter_does_not_query_database(self):
+        self.create.return_value = 1
+        # Held by another request, not re-entered by this one
+        holder = threading.Thread(
+            target=pg_lock.PGLock(None, TENANT_ID).acquire)
+        holder.start()
+        holder.join()
+        lock = pg_lock.PGLock(None, TENANT_ID)
+        self.assertRaises(p_exc.TenantResourcesInUse, lock.acquire,
+                          blocking=False)
+        self.assertEqual(1, self.create.call_count)
+
+    def test_fair_lock_waits_its_turn(self):
+        self.config(lock_fair=True, group='plumgriddirector')
+        self.create.side_effect = [None, 5]
+        queued = mock.patch.object(lock_object.PGLock, 'queued',
+                                   side_effect=[False, True, False]).start()
+        enqueue = mock.patch.object(lock_object.PGLock, 'enqueue',
+                                    return_value=9).start()
+        dequeue = mock.patch.object(lock_object.PGLock, 'dequeue').start()
+        lock = pg_lock.PGLock(None, TENANT_ID)
+        lock.acquire()
+        self.assertEqual(5, lock.token)
+        enqueue.assert_called_once_with(TENANT_ID, lock.owner, mock.ANY)
+        self.assertEqual([mock.call(TENANT_ID, None, mock.ANY),
+                          mock.call(TENANT_ID, 9, mock.ANY),
+                          mock.call(TENANT_ID, 9, mock.ANY)],
+                         queued.call_args_list)
+        dequeue.assert_called_once_with(9)
+        self.assertIsNone(lock.ticket)
+
+    def test_lock_owners_are_unique(self):
+        self.assertNotEqual(pg_lock.PGLock(None, TENANT_ID).owner,
+                            pg_lock.PGLock(None, TENANT_ID).owner)
+
+    def test_verify_checks_lock_is_owned(self):
+        self.create.return_value = 3
+        lock = pg_lock.PGLock(None, TENANT_ID)
+        lock.acquire()
+        with mock.patch.object(lock_object.PGLock, 'owned',
+                               side_effect=[True, False]) as owned:
+            pg_lock.verify_held()
+            self.assertRaises(p_exc.TenantResourcesInUse,
+                              pg_lock.verify_held)
+        owned.assert_called_with(TENANT_ID, lock.owner, 3)
+        self.assertTrue(lock.lost)
+
+    def test_lost_lease_fails_verify(self):
+        self.create.return_value = 3
+        lock = pg_lock.PGLock(None, TENANT_ID)
+        lock.acquire()
+        keeper = pg_lock.LeaseKeeper()
+        keeper._locks[lock.owner] = lock
+        with mock.patch.object(lock_object.PGLock, 'renew',
+                               return_value=set([lock.owner])), \
+                mock.patch.object(pg_lock.time, 'sleep'):
+            keeper._run()
+        with mock.patch.object(lock_object.PGLock, 'owned') as owned:
+            self.assertRaises(p_exc.TenantResourcesInUse, lock.verify)
+        self.assertFalse(owned.called)
+
+
+class TestPGLockHierarchy(PGLockTestCase):
+
+    def setUp(self):
+        super(TestPGLockHierarchy, self).setUp()
+        self.create.return_value = 1
+        self.release = mock.patch.object(lock_object.PGLock,
+                                         'release').start()
+        self.held = mock.patch.object(lock_object.PGLock, 'held').start()
+
+    def test_nested_lock_steps_back_for_parent(self):
+        self.held.side_effect = [True, False]
+        lock = pg_lock.PGLock(None, NETWORK_ID, parent=TENANT_ID)
+        lock.acquire()
+        self.assertEqual(2, self.create.call_count)
+        self.release.assert_called_once_with(NETWORK_ID, lock.owner)
+        self.held.assert_called_with(TENANT_ID, [lock.owner])
+        self.assertFalse(self.children.called)
+
+    def test_parent_lock_waits_for_nested_locks(self):
+        self.children.side_effect = [2, 1, 0]
+        lock = pg_lock.PGLock(None, TENANT_ID)
+        lock.acquire()
+        self.assertEqual(1, self.create.call_count)
+        self.assertEqual(3, self.children.call_count)
+        self.assertFalse(self.release.called)
+
+    def test_parent_lock_gives_up_on_nested_locks(self):
+        self.children.return_value = 1
+        lock = pg_lock.PGLock(None, TENANT_ID)
+        self.assertRaises(p_exc.TenantResourcesInUse, lock.acquire,
+                          blocking=False)
+        self.release.assert_called_once_with(TENANT_ID, lock.owner)
+
+    def test_reentrant_lock(self):
+        self.held.return_value = False
+        lock = pg_lock.PGLock(None, NETWORK_ID, parent=TENANT_ID)
+        lock.acquire()
+        again = pg_lock.PGLock(None, NETWORK_ID, parent=TENANT_ID)
+        again.acquire()
+        again.release(NETWORK_ID)
+        self.assertEqual(1, self.create.call_count)
+        self.assertFalse(self.release.called)
+        lock.release(NETWORK_ID)
+        self.release.assert_called_once_with(NETWORK_ID, lock.owner)
+
+    def test_nested_lock_covered_by_parent(self):
+        parent = pg_lock.PGLock(None, TENANT_ID)
+        parent.acquire()
+        pg_lock.PGLock(None, NETWORK_ID, parent=TENANT_ID).acquire()
+        self.assertEqual(1, self.create.call_count)
+        parent.release(TENANT_ID)
+
+    def test_parent_lock_ignores_own_nested_locks(self):
+        self.held.return_value = False
+        child = pg_lock.PGLock(None, NETWORK_ID, parent=TENANT_ID)
+        child.acquire()
+        parent = pg_lock.PGLock(None, TENANT_ID)
+        parent.acquire()
+        self.children.assert_called_with(TENANT_ID,
+                                         [parent.owner, child.owner])
+        parent.release(TENANT_ID)
+        child.release(NETWORK_ID)
+
+    def test_lock_set_canonical_order(self):
+        self.held.return_value = False
+        locks = pg_lock.PGLockSet(None, [("net-b", TENANT_ID), "tenant-b",
+                                         ("net-a", TENANT_ID), "tenant-a",
+                                         ("net-a", TENANT_ID)])
+        with locks.hold():
+            self.assertEqual(["tenant-a", "tenant-b", "net-a", "net-b"],
+                             [c[0][0] for c in self.create.call_args_list])
+        self.assertEqual(["net-b", "net-a", "tenant-b", "tenant-a"],
+                         [c[0][0] for c in self.release.call_args_list])
+
+    def test_lock_set_releases_on_failure(self):
+        self.held.return_value = False
+        self.create.side_effect = [1, None]
+        locks = pg_lock.PGLockSet(None, ["tenant-a", "tenant-b"])
+        self.assertRaises(p_exc.TenantResourcesInUse, locks.acquire,
+                          blocking=False)
+        self.release.assert_called_once_with("tenant-a", mock.ANY)
+        self.assertEqual([], pg_lock.held_locks())
+
+
+class TestLockStats(PGLockTestCase):
+
+    def setUp(self):
+        super(TestLockStats, self).setUp()
+        self.release = mock.patch.object(lock_object.PGLock,
+                                         'release').start()
+        self.release.return_value = None
+        mock.patch.object(lock_object.PGLock, 'held',
+                          return_value=False).start()
+        self.stats = mock.patch.object(pg_lock, 'stats',
+                                       pg_lock.LockStats()).start()
+
+    def test_acquire_and_release(self):
+        self.create.side_effect = [None, 2]
+        lock = pg_lock.PGLock(None, NETWORK_ID, parent=TENANT_ID,
+                              name="_update_network_pg")
+        lock.acquire()
+        lock.release(NETWORK_ID)
+        stats = self.stats.snapshot()
+        for group, key in (('class', 'resource'), ('tenant', TENANT_ID),
+                           ('method', '_update_network_pg')):
+            self.assertEqual(1, stats[group][key]['acquired'])
+            self.assertEqual(1, stats[group][key]['retries'])
+            self.assertEqual(1, stats[group][key]['released'])
+        self.assertEqual(['resource'], list(self.stats.snapshot('class')))
+
+    def test_failure_and_expired_release(self):
+        self.create.return_value = None
+        self.assertRaises(p_exc.TenantResourcesInUse,
+                          pg_lock.PGLock(None, TENANT_ID).acquire,
+                          blocking=False)
+        self.create.return_value = 1
+        self.release.return_value = True
+        lock = pg_lock.PGLock(None, pg_lock.GL)
+        lock.acquire()
+        lock.release(pg_lock.GL)
+        stats = self.stats.snapshot('class')
+        self.assertEqual(1, stats['tenant']['failed'])
+        self.assertEqual(1, stats['gateway']['expired'])
+        self.stats.reset()
+        self.assertEqual({}, self.stats.snapshot())
+
+    def test_poll_interval_follows_hold_time(self):
+        self.config(lock_poll_interval_max=1, group='plumgriddirector')
+        lock = pg_lock.PGLock(None, NETWORK_ID, parent=TENANT_ID,
+                              name="_delete_router_pg")
+        self.assertEqual(0.001, lock._poll_interval())
+        self.stats.released(lock, 2.0)
+        self.stats.released(lock, 1.0)
+        self.assertAlmostEqual(1.8, self.stats.expected_hold(lock))
+        self.assertAlmostEqual(0.45, lock._poll_interval())
+        other = pg_lock.PGLock(None, NETWORK_ID, parent=TENANT_ID,
+                               name="_update_port_pg")
+        self.assertAlmostEqual(1.8, self.stats.expected_hold(other))
+        self.stats.released(other, 0.0)
+        self.assertEqual(0.001, other._poll_interval())
+        self.stats.released(lock, 100)
+        self.assertEqual(1, lock._poll_interval())
+
+
+class TestStripedLock(base.BaseTestCase):
+
+    def test_stripe_is_picked_by_key(self):
+        self.config(port_lock_stripes=4, group='plumgriddirector')
+        with mock.patch.object(pg_lock.lockutils, 'lock') as lock:
+            pg_lock.striped_lock('net-pg', NETWORK_ID)
+            pg_lock.striped_lock('net-pg', NETWORK_ID)
+        self.assertEqual(lock.call_args_list[0], lock.call_args_list[1])
+        name = lock.call_args[0][0]
+        self.assertIn(name, ['net-pg-%d' % i for i in range(4)])
+
+    def test_no_stripe_under_held_lock(self):
+        held = pg_lock.PGLock(None, NETWORK_ID, parent=TENANT_ID)
+        with mock.patch.object(pg_lock, 'held_locks', return_value=[held]), \
+                mock.patch.object(pg_lock.lockutils, 'lock') as lock:
+            with pg_lock.striped_lock('net-pg', NETWORK_ID):
+                pass
+            pg_lock.striped_lock('net-pg', TENANT_ID)
+        self.assertEqual(1, lock.call_count)
@@ -0,0 +1,37 @@
+# Copyright 2016 PLUMgrid, Inc. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+PLUMgrid director update delta unit tests
+"""
+
+from networking_plumgrid.neutron.plugins.common import delta as pg_delta
+from neutron.tests import base
+
+
+class TestDirectorDelta(base.BaseTestCase):
+
+    def test_director_delta(self):
+        orig = {'id': 'abcdefgh', 'name': 'a', 'admin_state_up': True}
+        self.assertEqual({}, pg_delta.director_delta(
+            orig, dict(orig, name='b', description='port')))
+        self.assertEqual({'admin_state_up': (True, False)},
+                         pg_delta.director_delta(
+                             orig, dict(orig, admin_state_up=False)))
+
+    def test_ignored_fields(self):
+        self.config(director_update_ignored_fields=[],
+                    group='plumgriddirector')
+        self.assertEqual({'name': ('a', 'b')}, pg_delta.director_delta(
+            {'name': 'a'}, {'name': 'b'}))
@@ -16,12 +16,19 @@
 Test cases for  Neutron PLUMgrid Plug-in
 """
 
+import contextlib
+import time
+
 import mock
 from oslo_utils import importutils
 
+from networking_plumgrid.neutron.plugins.common import exceptions as plum_excep
+from networking_plumgrid.neutron.plugins.common.locking import lock as pg_lock
 from networking_plumgrid.neutron.plugins.extensions import portbindings
 from networking_plumgrid.neutron.plugins import plugin as plumgrid_plugin
+from neutron.common import constants
 from neutron import context
+from neutron.db import extraroute_db
 from neutron.extensions import providernet as provider
 from neutron import manager
 from neutron.tests.unit import _test_extension_portbindings as test_bindings
@@ -254,6 +261,116 @@ class TestPlumgridProvidernet(PLUMgridPluginV2TestCase):
         return res["id"]
 
 
+class TestPlumgridDirectorDelta(PLUMgridPluginV2TestCase):
+
+    def test_update_port_without_director_changes(self):
+        plugin = manager.NeutronManager.get_plugin()
+        with self.port() as port, \
+                mock.patch.object(plugin._plumlib, 'update_port') as update:
+            port_id = port['port']['id']
+            self._update('ports', port_id, {'port': {'name': 'renamed'}})
+            self.assertFalse(update.called)
+            self._update('ports', port_id,
+                         {'port': {'admin_state_up': False}})
+            self.assertTrue(update.called)
+
+
+class TestPlumgridPortLockKey(PLUMgridPluginV2TestCase):
+
+    def test_port_lock_key(self):
+        plugin = manager.NeutronManager.get_plugin()
+        port = {"network_id": "b843d18245678",
+                "device_owner": constants.DEVICE_OWNER_DHCP}
+        self.assertEqual(("b843d18245678", "94eb42de4e331"),
+                         plugin._port_lock_key(port, "94eb42de4e331"))
+        port["device_owner"] = constants.DEVICE_OWNER_ROUTER_GW
+        self.assertEqual(("b843d18245678", pg_lock.GL),
+                         plugin._port_lock_key(port, "94eb42de4e331"))
+
+
+class TestPlumgridRouterInterfaceLocks(PLUMgridPluginV2TestCase):
+
+    def test_remove_router_interface_locks_router_and_network(self):
+        plugin = manager.NeutronManager.get_plugin()
+        ctx = context.get_admin_context()
+        port = {"id": "abcdefgh", "network_id": "b843d18245678"}
+        with mock.patch.object(plugin, '_get_port', return_value=port), \
+                mock.patch.object(extraroute_db.ExtraRoute_db_mixin,
+                                  'remove_router_interface'), \
+                mock.patch.object(pg_lock, 'PGLockSet') as lock_set:
+            plugin._remove_router_interface_pg(ctx, "e623679734051",
+                                               {"port_id": "abcdefgh"},
+                                               None, "94eb42de4e331")
+        self.assertEqual(set([("e623679734051", "94eb42de4e331"),
+                              ("b843d18245678", "94eb42de4e331")]),
+                         set(lock_set.call_args[0][1]))
+        lock_set.return_value.hold.assert_called_once_with()
+
+
+class TestPlumgridDeleteRouter(PLUMgridPluginV2TestCase):
+
+    def setUp(self):
+        super(TestPlumgridDeleteRouter, self).setUp()
+        self.plugin = manager.NeutronManager.get_plugin()
+        self.events = []
+        router = mock.Mock()
+        router.attached_ports.all.return_value = [
+            mock.Mock(port=mock.MagicMock(id=port_id))
+            for port_id in ("abcdefgh", "ijklmnop")]
+        mock.patch.object(self.plugin, '_ensure_router_not_in_use',
+                          return_value=router).start()
+
+        def delete_port(context, port_id):
+            self.plugin._director("delete_port", {"id": port_id}, None)
+        mock.patch.object(self.plugin, 'delete_port',
+                          side_effect=delete_port).start()
+
+        @contextlib.contextmanager
+        def hold():
+            try:
+                yield
+            finally:
+                self.events.append("released")
+        lock_set = mock.patch.object(pg_lock, 'PGLockSet').start()
+        lock_set.return_value.hold.side_effect = hold
+        self.delete_router = mock.patch.object(
+            extraroute_db.ExtraRoute_db_mixin, 'delete_router').start()
+        self.director_delete_router = mock.patch.object(
+            self.plugin._plumlib, 'delete_router').start()
+
+    def _delete_router(self):
+        self.plugin._delete_router_pg(context.get_admin_context(),
+                                      "e623679734051", "94eb42de4e331")
+
+    def test_port_deletions_joined_before_locks_are_released(self):
+        def delete_port(port_db, router_db):
+            time.sleep(0.05)
+            self.events.append(port_db["id"])
+        with mock.patch.object(self.plugin._plumlib, 'delete_port',
+                               side_effect=delete_port):
+            self._delete_router()
+        self.assertEqual(["abcdefgh", "ijklmnop"],
+                         sorted(self.events[:2]))
+        self.assertEqual("released", self.events[2])
+        self.assertTrue(self.delete_router.called)
+        self.assertTrue(self.director_delete_router.called)
+
+    def test_failed_port_deletion_fails_router_deletion(self):
+        def delete_port(port_db, router_db):
+            if port_db["id"] == "ijklmnop":
+                raise ValueError("director error")
+            time.sleep(0.05)
+            self.events.append(port_db["id"])
+        with mock.patch.object(self.plugin._plumlib, 'delete_port',
+                               side_effect=delete_port):
+            self.assertRaises(plum_excep.PLUMgridException,
+                              self._delete_router)
+        # The other deletion finished before the locks went away
+        self.assertEqual(["abcdefgh", "released"], self.events)
+        self.assertFalse(self.delete_router.called)
+        self.assertFalse(self.director_delete_router.called)
+
+
 class TestDisassociateFloatingIP(PLUMgridPluginV2TestCase):
 
     def test_disassociate_floating_ip(self):